@@ -0,0 +1,127 @@
+'''
+  stress test the concurrent mode: read throughput under concurrent writes
+
+  python benchmarks/concurrency.py --edges 10000 --readers 4 --batches 1 100
+  python benchmarks/concurrency.py --output concurrency.json
+
+  reader threads run a mix of queries (neighbor lists, degrees and hop
+  distances) for --seconds while one writer thread moves edges around in
+  transactions of --batches edges each; the same readers are also timed
+  without the lock and without a writer for reference
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from simple_graph import Graph
+from simple_graph.generators import gnm_edges
+
+def build(m, seed, concurrent):
+  n = max(m // 4, 2)
+  G = Graph()
+  G.add_edges_from_arrays(*gnm_edges(n, m, True, seed))
+  if concurrent:
+    G.enable_concurrency()
+  return G
+
+def reader(G, vertices, seed, stop, counts):
+  rng = random.Random(seed)
+  reads = 0
+  while not stop.is_set():
+    u, v = rng.choice(vertices), rng.choice(vertices)
+    kind = reads % 3
+    if kind == 0:
+      len(G.neighbors(u))
+    elif kind == 1:
+      G.degree(u)
+    else:
+      G.shortest_path_length(u, v, weight=None)
+    reads += 1
+  counts.append(reads)
+
+def writer(G, vertices, batch, seed, stop, counts):
+  # add random edges and remove them again a few batches later, so the
+  # graph keeps its size
+  rng = random.Random(seed)
+  added = deque()
+  writes = 0
+  while not stop.is_set():
+    with G.transaction():
+      for _ in range(batch):
+        u, v = rng.choice(vertices), rng.choice(vertices)
+        if not G.has_edge(u, v):
+          G.add_edge(u, v)
+          added.append((u, v))
+        if len(added) > 4 * batch:
+          G.remove_edge(*added.popleft())
+    writes += batch
+    # give the readers a turn between transactions, as a real updater would
+    time.sleep(0.001)
+  counts.append(writes)
+
+def run_case(m, seed, readers, seconds, concurrent, batch):
+  G = build(m, seed, concurrent)
+  vertices = G.vertices
+  stop = threading.Event()
+  reads, writes = [], []
+  threads = [threading.Thread(target=reader, args=(G, vertices, seed + i, stop, reads)) for i in range(readers)]
+  if batch:
+    threads.append(threading.Thread(target=writer, args=(G, vertices, batch, seed, stop, writes)))
+  for thread in threads:
+    thread.start()
+  time.sleep(seconds)
+  stop.set()
+  for thread in threads:
+    thread.join()
+  return {
+    'edges': m,
+    'readers': readers,
+    'concurrent': concurrent,
+    'batch': batch,
+    'reads_per_second': sum(reads) / seconds,
+    'writes_per_second': sum(writes) / seconds,
+  }
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Read throughput of a concurrent Graph under writes.')
+  parser.add_argument('--edges', type=int, default=10**4)
+  parser.add_argument('--readers', type=int, default=4)
+  parser.add_argument('--batches', type=int, nargs='+', default=[1, 10, 100], help='edges moved per write transaction')
+  parser.add_argument('--seconds', type=float, default=2.0)
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--output', default='concurrency_results.json')
+  args = parser.parse_args(argv)
+
+  # (concurrent, batch); batch 0 runs the readers alone
+  plan = [(False, 0), (True, 0)] + [(True, batch) for batch in args.batches]
+  results = []
+  for concurrent, batch in plan:
+    result = run_case(args.edges, args.seed, args.readers, args.seconds, concurrent, batch)
+    results.append(result)
+    mode = 'locked' if concurrent else 'unlocked'
+    print(f'{mode:>8} batch {batch:>5} {result["reads_per_second"]:12.0f} reads/s {result["writes_per_second"]:10.0f} writes/s', flush=True)
+  report = {
+    'meta': {
+      'date': datetime.now(timezone.utc).isoformat(),
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'seconds': args.seconds,
+      'seed': args.seed,
+    },
+    'results': results,
+  }
+  with open(args.output, 'w') as f:
+    json.dump(report, f, indent=2)
+  print(f'\nresults written to {args.output}')
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,187 @@
+'''
+  benchmark the Graph hot paths on generated graphs at several scales
+
+  python benchmarks/run.py --scales 1000 10000 --output results.json
+  python benchmarks/run.py --baseline results.json --threshold 0.2
+
+  every case is timed --repeat times (the best run is kept) and run once
+  more under tracemalloc for its peak memory; results are written as JSON
+  and, given a baseline file from an earlier run, compared case by case
+'''
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from simple_graph import Graph
+from simple_graph.generators import gnm_edges, gnp_edges, barabasi_albert_edges
+
+# family -> (undirected, edge generator for about m edges)
+FAMILIES = {
+  'sparse': (True, lambda m, seed: gnm_edges(max(m // 4, 2), m, True, seed)),
+  'dense': (True, lambda m, seed: gnp_edges(int((20 * m) ** 0.5) + 2, 0.1, True, seed)),
+  'power_law': (True, lambda m, seed: barabasi_albert_edges(m // 4 + 4, 4, seed)),
+  'directed': (False, lambda m, seed: gnm_edges(max(m // 4, 2), m, False, seed)),
+}
+
+# operation -> largest number of edges it is run at, the slow analytics
+# would take hours on the biggest graphs
+LIMITS = {
+  'add_edge': 10**5,
+  'add_edges': 10**6,
+  'add_edges_from_arrays': 10**6,
+  'load': 10**6,
+  'neighbors': 10**6,
+  'freeze': 10**6,
+  'connected_components': 10**6,
+  'edge_betweenness': 10**3,
+  'edge_betweenness_sampled': 10**5,
+  'max_cliques': 10**4,
+  'iter_cliques': 10**5,
+  'diameter': 10**5,
+}
+
+def build(undirected, sources, targets):
+  G = Graph(undirected=undirected)
+  G.add_edges_from_arrays(sources, targets)
+  return G
+
+def cases(family, m, seed, folder):
+  '''
+    (operation, setup, run) triples, setup builds the input outside the timer
+  '''
+  undirected, generate = FAMILIES[family]
+  sources, targets = generate(m, seed)
+  edges = list(zip(sources, targets))
+  path = os.path.join(folder, f'{family}_{m}.txt')
+  with open(path, 'w') as f:
+    f.write('# E\n')
+    f.writelines(f'{u},{v}\n' for u, v in edges)
+
+  def graph():
+    return build(undirected, sources, targets)
+
+  def add_edge(_):
+    G = Graph(undirected=undirected)
+    for u, v in edges:
+      G.add_edge(u, v)
+
+  def neighbors(G):
+    total = 0
+    for v in G.iter_vertices():
+      for _ in G.neighbors(v):
+        total += 1
+    return total
+
+  yield 'add_edge', lambda: None, add_edge
+  yield 'add_edges', lambda: Graph(undirected=undirected), lambda G: G.add_edges(edges)
+  yield 'add_edges_from_arrays', lambda: None, lambda _: graph()
+  yield 'load', lambda: Graph(undirected=undirected), lambda G: G.load(path)
+  yield 'neighbors', graph, neighbors
+  yield 'freeze', graph, lambda G: G.freeze()
+  yield 'connected_components', graph, lambda G: G.connected_components
+  yield 'edge_betweenness', graph, lambda G: G.edge_betweenness()
+  yield 'edge_betweenness_sampled', graph, lambda G: G.edge_betweenness(k=min(64, G.number_of_vertices()), seed=seed)
+  if undirected:
+    yield 'max_cliques', graph, lambda G: G.max_cliques
+    yield 'iter_cliques', graph, lambda G: sum(1 for _ in G.iter_cliques())
+    yield 'diameter', graph, lambda G: G.diameter()
+
+def measure(setup, run, repeat, memory):
+  best = None
+  for _ in range(repeat):
+    G = setup()
+    start = time.perf_counter()
+    run(G)
+    elapsed = time.perf_counter() - start
+    best = elapsed if best is None else min(best, elapsed)
+  peak = None
+  if memory:
+    G = setup()
+    tracemalloc.start()
+    run(G)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+  return best, peak
+
+def run_suite(scales, families, operations, repeat, memory, seed):
+  results = []
+  with tempfile.TemporaryDirectory() as folder:
+    for family in families:
+      for m in scales:
+        for operation, setup, run in cases(family, m, seed, folder):
+          if operation not in operations or m > LIMITS[operation]:
+            continue
+          seconds, peak = measure(setup, run, repeat, memory)
+          results.append({'family': family, 'edges': m, 'operation': operation, 'seconds': seconds, 'peak_bytes': peak})
+          print(f'{family:>10} {m:>8} {operation:<26} {seconds:10.4f}s' + (f' {peak / 2**20:9.1f} MiB' if peak is not None else ''), flush=True)
+  return results
+
+def compare(results, baseline, threshold):
+  '''
+    print the time ratio against the baseline for every common case,
+    returns the cases slower by more than the threshold
+  '''
+  key = lambda r: (r['family'], r['edges'], r['operation'])
+  before = {key(r): r for r in baseline['results']}
+  regressions = []
+  print(f'\n{"case":<50} {"baseline":>10} {"current":>10} {"ratio":>7}')
+  for r in results:
+    b = before.get(key(r))
+    if b is None:
+      continue
+    ratio = r['seconds'] / b['seconds'] if b['seconds'] > 0 else float('inf')
+    flag = ''
+    if ratio > 1 + threshold:
+      regressions.append(r)
+      flag = ' slower'
+    elif ratio < 1 / (1 + threshold):
+      flag = ' faster'
+    name = '/'.join(map(str, key(r)))
+    print(f'{name:<50} {b["seconds"]:10.4f} {r["seconds"]:10.4f} {ratio:7.2f}{flag}')
+  return regressions
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmark the simple_graph hot paths.')
+  parser.add_argument('--scales', type=int, nargs='+', default=[10**3, 10**4, 10**5, 10**6], help='numbers of edges')
+  parser.add_argument('--families', nargs='+', default=list(FAMILIES), choices=list(FAMILIES))
+  parser.add_argument('--operations', nargs='+', default=list(LIMITS), choices=list(LIMITS))
+  parser.add_argument('--repeat', type=int, default=3)
+  parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the tracemalloc run')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--output', default='benchmark_results.json')
+  parser.add_argument('--baseline', help='results of an earlier run to compare against')
+  parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown reported as a regression')
+  args = parser.parse_args(argv)
+
+  results = run_suite(args.scales, args.families, args.operations, args.repeat, args.memory, args.seed)
+  report = {
+    'meta': {
+      'date': datetime.now(timezone.utc).isoformat(),
+      'python': platform.python_version(),
+      'platform': platform.platform(),
+      'repeat': args.repeat,
+      'seed': args.seed,
+    },
+    'results': results,
+  }
+  with open(args.output, 'w') as f:
+    json.dump(report, f, indent=2)
+  print(f'\nresults written to {args.output}')
+  if args.baseline:
+    with open(args.baseline) as f:
+      baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+      print(f'\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}')
+      return 1
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(main())
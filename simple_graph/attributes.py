@@ -0,0 +1,262 @@
+from array import array
+from .sharing import CopyOnWrite, read_only_class
+
+class AttributeStore(CopyOnWrite):
+  '''
+    columnar attribute storage for vertices or edges
+
+    every element owns an integer slot. weights live in a typed array('d')
+    column with a presence mask, any other attribute in a sparse column
+    (a dict from slot to value), so elements without attributes cost only
+    their slot in the weight column
+  '''
+  _transient = ('_owned_columns',)
+
+  def __init__(self):
+    self.clear()
+
+  def clear(self):
+    self.weights = array('d')
+    self.has_weight = bytearray()
+    self.columns = {}
+    self.weighted = 0 # number of slots carrying a weight
+    self.weight_total = 0.0 # sum of their weights
+    self._free = []
+    self._owned_columns = None # columns copied since the last share()
+    self._forget()
+
+  def share(self):
+    '''
+      a read-only store sharing the columns with this one, see CopyOnWrite
+    '''
+    store = FrozenAttributeStore.__new__(FrozenAttributeStore)
+    store.__dict__.update(self.__dict__)
+    store._forget()
+    self._track(store)
+    return store
+
+  def _detach(self):
+    # the typed columns are copied whole, the sparse ones on their first write
+    self.weights = self.weights[:]
+    self.has_weight = self.has_weight[:]
+    self._free = list(self._free)
+    self.columns = dict(self.columns)
+    self._owned_columns = set()
+
+  def _column(self, name):
+    # a sparse column safe to write to
+    column = self.columns[name]
+    owned = self._owned_columns
+    if owned is not None and name not in owned:
+      if self._shared():
+        column = self.columns[name] = dict(column)
+        owned.add(name)
+      else:
+        self._owned_columns = None
+    return column
+
+  def allocate(self, attributes=None):
+    if self._pending:
+      self._write()
+    if self._free:
+      slot = self._free.pop()
+    else:
+      slot = len(self.weights)
+      self.weights.append(0.0)
+      self.has_weight.append(0)
+    if attributes:
+      self.update(slot, attributes)
+    return slot
+
+  def extend(self, k):
+    '''
+      append k empty slots
+    '''
+    if self._pending:
+      self._write()
+    self.weights.frombytes(bytes(self.weights.itemsize * k))
+    self.has_weight.extend(bytes(k))
+
+  def set_weights(self, slots, weights):
+    if self._pending:
+      self._write()
+    column, mask = self.weights, self.has_weight
+    added = 0
+    total = 0.0
+    for slot, w in zip(slots, weights):
+      if mask[slot]:
+        total -= column[slot]
+      else:
+        mask[slot] = 1
+        added += 1
+      column[slot] = w
+      total += column[slot]
+    self.weighted += added
+    self.weight_total += total
+
+  def fill_weights(self, start, weights):
+    '''
+      weigh the fresh slots start, start+1, ... in one slice assignment
+    '''
+    if self._pending:
+      self._write()
+    k = len(weights)
+    column = weights if isinstance(weights, array) and weights.typecode == 'd' else array('d', weights)
+    self.weights[start:start+k] = column
+    self.has_weight[start:start+k] = b'\x01' * k
+    self.weighted += k
+    self.weight_total += sum(column)
+
+  def fill_columns(self, columns):
+    '''
+      set (values, mask) columns as kept by CSRGraph on the slots 0, 1, ...
+    '''
+    if self._pending:
+      self._write()
+    for name, (values, mask) in columns.items():
+      if name == 'weight' and mask is None:
+        self.fill_weights(0, values)
+        continue
+      slots = range(len(values)) if mask is None else [i for i in range(len(values)) if mask[i]]
+      if name == 'weight':
+        self.set_weights(slots, [float(values[i]) for i in slots])
+        continue
+      column = self.columns.get(name)
+      if column is None:
+        column = self.columns[name] = {}
+        if self._owned_columns is not None:
+          self._owned_columns.add(name)
+      else:
+        column = self._column(name)
+      column.update((i, values[i]) for i in slots)
+
+  def release(self, slot):
+    self.reset(slot)
+    self._free.append(slot)
+
+  def reset(self, slot):
+    if self._pending:
+      self._write()
+    if self.has_weight[slot]:
+      self.has_weight[slot] = 0
+      self.weighted -= 1
+      self.weight_total -= self.weights[slot]
+    if self._owned_columns is None:
+      for column in self.columns.values():
+        column.pop(slot, None)
+      return
+    for name in list(self.columns):
+      if slot in self.columns[name]:
+        del self._column(name)[slot]
+
+  def update(self, slot, attributes):
+    for name, value in attributes.items():
+      self.set(slot, name, value)
+
+  def set(self, slot, name, value):
+    if self._pending:
+      self._write()
+    if name == 'weight':
+      if self.has_weight[slot]:
+        self.weight_total -= self.weights[slot]
+      else:
+        self.has_weight[slot] = 1
+        self.weighted += 1
+      self.weights[slot] = float(value)
+      self.weight_total += self.weights[slot]
+    else:
+      column = self.columns.get(name)
+      if column is None:
+        column = self.columns[name] = {}
+        if self._owned_columns is not None:
+          self._owned_columns.add(name)
+      elif self._owned_columns is not None:
+        column = self._column(name)
+      column[slot] = value
+
+  def get(self, slot, name):
+    if name == 'weight':
+      if self.has_weight[slot]:
+        return self.weights[slot]
+      raise KeyError(name)
+    return self.columns[name][slot]
+
+  def delete(self, slot, name):
+    if self._pending:
+      self._write()
+    if name == 'weight':
+      if not self.has_weight[slot]:
+        raise KeyError(name)
+      self.has_weight[slot] = 0
+      self.weighted -= 1
+      self.weight_total -= self.weights[slot]
+    else:
+      del self._column(name)[slot]
+
+  def weight(self, slot, default):
+    return self.weights[slot] if self.has_weight[slot] else default
+
+  def to_dict(self, slot):
+    attributes = {'weight': self.weights[slot]} if self.has_weight[slot] else {}
+    for name, column in self.columns.items():
+      if slot in column:
+        attributes[name] = column[slot]
+    return attributes
+
+FrozenAttributeStore = read_only_class(AttributeStore, 'FrozenAttributeStore')
+
+class Element:
+  '''
+    lightweight proxy exposing the attributes of one slot as object attributes
+  '''
+  __slots__ = ('_store', '_slot', '_owner')
+
+  def __init__(self, store, slot, owner=None):
+    object.__setattr__(self, '_store', store)
+    object.__setattr__(self, '_slot', slot)
+    object.__setattr__(self, '_owner', owner)
+
+  def __getattr__(self, name):
+    try:
+      return self._store.get(self._slot, name)
+    except KeyError:
+      raise AttributeError(name) from None
+
+  def __setattr__(self, name, value):
+    self._apply(self._set, name, value)
+
+  def __delattr__(self, name):
+    try:
+      self._apply(self._delete, name)
+    except KeyError:
+      raise AttributeError(name) from None
+
+  def _apply(self, write, *args):
+    # writes go through the on_write hook of the owning container (set by
+    # the graph), so they take its lock and discard its derived state
+    hook = getattr(self._owner, 'on_write', None)
+    on_write = None if hook is None else hook()
+    if on_write is None:
+      write(*args)
+    else:
+      on_write(write, *args)
+
+  def _set(self, name, value):
+    self._store.set(self._slot, name, value)
+
+  def _delete(self, name):
+    self._store.delete(self._slot, name)
+
+  def __eq__(self, other):
+    if not isinstance(other, Element):
+      return NotImplemented
+    return self._store is other._store and self._slot == other._slot
+
+  def __hash__(self):
+    return hash((id(self._store), self._slot))
+
+  def __repr__(self):
+    return str(self.to_dict())
+
+  def to_dict(self):
+    return self._store.to_dict(self._slot)
@@ -0,0 +1,182 @@
+import json
+import mmap as _mmap
+import struct
+from array import array
+from .csr import CSRGraph
+
+'''
+  binary graph format
+
+  header: magic, format version, flags, length of the metadata block
+  metadata: JSON describing every section (offset, length, type)
+  sections: 8-byte aligned arrays, so they can be mapped without copying
+
+  numeric attribute columns are stored as float64/int64 arrays with an
+  optional presence mask, other attributes and the vertex labels as JSON;
+  values plain JSON would not give back (tuples, dicts with non-string
+  keys) go in a 'tagged' JSON section that spells out every container
+'''
+
+MAGIC = b'SGRAPH\x00\x00'
+VERSION = 2 # 2: tagged JSON sections
+_HEADER = struct.Struct('<8sIIQ')
+_ALIGN = 8
+_FLAG_UNDIRECTED = 1
+_ARRAYS = ('offsets', 'targets', 'weights', 'edge_ids', 'sources', 'destinations')
+_REVERSE_ARRAYS = ('r_offsets', 'r_targets', 'r_weights', 'r_edge_ids')
+
+_SCALARS = (str, int, float, bool, type(None))
+_INT64_MIN, _INT64_MAX = -2**63, 2**63 - 1 # ints outside go to JSON
+
+def _plain(value):
+  # True if json.loads(json.dumps(value)) gives value back
+  if type(value) in _SCALARS:
+    return True
+  if type(value) is list:
+    return all(_plain(x) for x in value)
+  if type(value) is dict:
+    return all(type(k) is str and _plain(x) for k, x in value.items())
+  return False
+
+def _encode(value):
+  if type(value) in _SCALARS:
+    return value
+  if type(value) is list:
+    return {'l': [_encode(x) for x in value]}
+  if type(value) is tuple:
+    return {'t': [_encode(x) for x in value]}
+  if type(value) is dict:
+    return {'d': [[_encode(k), _encode(x)] for k, x in value.items()]}
+  raise ValueError(f'{type(value).__name__} values can not be stored in a binary graph file.')
+
+def _decode(value):
+  if type(value) is not dict:
+    return value
+  kind, items = next(iter(value.items()))
+  if kind == 'l':
+    return [_decode(x) for x in items]
+  if kind == 't':
+    return tuple(_decode(x) for x in items)
+  return {_decode(k): _decode(x) for k, x in items}
+
+class _Writer:
+
+  def __init__(self):
+    self.chunks = []
+    self.size = 0
+
+  def add(self, data, kind):
+    data = bytes(data) if not isinstance(data, bytes) else data
+    offset = self.size
+    self.chunks.append(data)
+    padding = -len(data) % _ALIGN
+    if padding:
+      self.chunks.append(b'\x00' * padding)
+    self.size += len(data) + padding
+    return [offset, len(data), kind]
+
+  def add_array(self, values, typecode):
+    if not isinstance(values, array) or values.typecode != typecode:
+      values = array(typecode, values)
+    if values.itemsize != 8:
+      raise ValueError(f'Unsupported array type {typecode}.')
+    return self.add(memoryview(values).cast('B'), typecode)
+
+  def add_json(self, value):
+    if _plain(value):
+      return self.add(json.dumps(value).encode('utf-8'), 'json')
+    return self.add(json.dumps(_encode(value)).encode('utf-8'), 'tagged')
+
+  def add_column(self, values, mask):
+    present = [x for i, x in enumerate(values) if mask is None or mask[i]]
+    if present and all(type(x) is float for x in present):
+      kind, fill = 'd', 0.0
+    elif present and all(type(x) is int and _INT64_MIN <= x <= _INT64_MAX for x in present):
+      kind, fill = 'q', 0
+    else:
+      kind, fill = 'json', None
+    column = [x if mask is None or mask[i] else fill for i, x in enumerate(values)]
+    entry = {'values': self.add_json(column) if kind == 'json' else self.add_array(column, kind)}
+    entry['mask'] = None if mask is None else self.add(bytes(mask), 'B')
+    return entry
+
+def save_binary(csr, path):
+  '''
+    write a CSRGraph snapshot to path
+  '''
+  writer = _Writer()
+  meta = {
+    'undirected': csr.undirected,
+    'unit_weights': csr.unit_weights,
+    'default_weight': csr.default_weight,
+    'labels': writer.add_json(csr.labels),
+    'arrays': {},
+    'vertex_attrs': {},
+    'edge_attrs': {},
+  }
+  names = _ARRAYS if csr.undirected else _ARRAYS + _REVERSE_ARRAYS
+  for name in names:
+    buffer = getattr(csr, name)
+    meta['arrays'][name] = writer.add_array(buffer, memoryview(buffer).format)
+  for name, (values, mask) in csr.vertex_attrs.items():
+    meta['vertex_attrs'][name] = writer.add_column(values, mask)
+  for name, (values, mask) in csr.edge_attrs.items():
+    meta['edge_attrs'][name] = writer.add_column(values, mask)
+
+  meta = json.dumps(meta).encode('utf-8')
+  meta += b' ' * (-(_HEADER.size + len(meta)) % _ALIGN)
+  flags = _FLAG_UNDIRECTED if csr.undirected else 0
+  with open(path, 'wb') as f:
+    f.write(_HEADER.pack(MAGIC, VERSION, flags, len(meta)))
+    f.write(meta)
+    for chunk in writer.chunks:
+      f.write(chunk)
+
+def open_binary(path, mmap=True):
+  '''
+    open a file written by save_binary as a read-only CSRGraph
+
+    with mmap=True the arrays are zero-copy views of a shared read-only
+    memory map, so the pages are shared by every process that opens the file
+  '''
+  with open(path, 'rb') as f:
+    if mmap:
+      buffer = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+    else:
+      buffer = f.read()
+  view = memoryview(buffer)
+  if len(view) < _HEADER.size:
+    raise ValueError(f'{path} is not a graph file.')
+  magic, version, flags, meta_length = _HEADER.unpack_from(view)
+  if magic != MAGIC:
+    raise ValueError(f'{path} is not a graph file.')
+  if version > VERSION:
+    raise ValueError(f'Unsupported graph file version {version}.')
+  start = _HEADER.size + meta_length
+  meta = json.loads(bytes(view[_HEADER.size:start]))
+
+  def section(entry):
+    offset, length, kind = entry
+    data = view[start+offset:start+offset+length]
+    if kind == 'json':
+      return json.loads(bytes(data))
+    if kind == 'tagged':
+      return _decode(json.loads(bytes(data)))
+    if kind == 'B':
+      return data
+    return data.cast(kind)
+
+  def columns(attrs):
+    return {name: (section(entry['values']), None if entry['mask'] is None else section(entry['mask']))
+            for name, entry in attrs.items()}
+
+  arrays = {name: section(entry) for name, entry in meta['arrays'].items()}
+  reverse = None
+  if not flags & _FLAG_UNDIRECTED:
+    reverse = tuple(arrays[name] for name in _REVERSE_ARRAYS)
+  csr = CSRGraph(section(meta['labels']), bool(flags & _FLAG_UNDIRECTED),
+                 *(arrays[name] for name in _ARRAYS[:4]), arrays['sources'], arrays['destinations'],
+                 reverse=reverse, unit_weights=meta['unit_weights'], default_weight=meta['default_weight'],
+                 vertex_attrs=columns(meta['vertex_attrs']), edge_attrs=columns(meta['edge_attrs']))
+  csr._buffer = buffer
+  return csr
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+from threading import Lock
+from functools import wraps
+
+class LRUCache:
+  '''
+    size-bounded least-recently-used cache of query results
+
+    keys carry the graph version, so results computed before a mutation
+    are never returned; they are dropped as soon as the version changes
+  '''
+
+  def __init__(self, maxsize=128):
+    if maxsize < 1:
+      raise ValueError('The cache needs a positive maxsize.')
+    self.maxsize = maxsize
+    self._entries = OrderedDict()
+    self.version = None
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.invalidations = 0
+    self._lock = Lock() # concurrent readers share the cache
+
+  def __getstate__(self):
+    state = self.__dict__.copy()
+    del state['_lock']
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._lock = Lock()
+
+  def __len__(self):
+    return len(self._entries)
+
+  def clear(self):
+    self._entries.clear()
+
+  def validate(self, version):
+    '''
+      forget everything computed before the given graph version
+    '''
+    if version != self.version:
+      with self._lock:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.version = version
+
+  def get(self, key, default=None):
+    entries = self._entries
+    with self._lock:
+      if key in entries:
+        entries.move_to_end(key)
+        self.hits += 1
+        return entries[key]
+      self.misses += 1
+      return default
+
+  def put(self, key, value):
+    entries = self._entries
+    with self._lock:
+      entries[key] = value
+      entries.move_to_end(key)
+      if len(entries) > self.maxsize:
+        entries.popitem(last=False)
+        self.evictions += 1
+
+  def info(self):
+    return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+      'invalidations': self.invalidations, 'size': len(self._entries), 'maxsize': self.maxsize}
+
+_MISSING = object()
+
+def _fresh(value):
+  # a copy of the containers of a cached result, so a caller may modify it
+  if type(value) is list:
+    return [_fresh(x) for x in value]
+  if type(value) is dict:
+    return {key: _fresh(x) for key, x in value.items()}
+  if type(value) is set:
+    return set(value)
+  if type(value) is tuple:
+    return tuple(_fresh(x) for x in value)
+  return value
+
+def cached(method):
+  '''
+    serve the result of a graph query from the graph's cache, if enabled;
+    calls with unhashable arguments are computed without caching. every
+    call gets its own copy of the lists, dicts and sets of the result
+  '''
+  name = method.__name__
+
+  @wraps(method)
+  def wrapper(self, *args, **kwargs):
+    cache = self._cache
+    if cache is None:
+      return method(self, *args, **kwargs)
+    key = (name, args, tuple(sorted(kwargs.items())), self.version)
+    try:
+      cache.validate(self.version)
+      result = cache.get(key, _MISSING)
+    except TypeError:
+      return method(self, *args, **kwargs)
+    if result is _MISSING:
+      result = method(self, *args, **kwargs)
+      cache.put(key, result)
+    return _fresh(result)
+  return wrapper
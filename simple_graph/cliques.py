@@ -0,0 +1,102 @@
+from concurrent.futures import ProcessPoolExecutor
+from .cores import core_decomposition
+
+_worker_neighbors = None
+_worker_position = None
+
+def _branch_cliques(neighbors, position, v, min_size):
+  '''
+    maximal cliques whose earliest vertex in the degeneracy order is v,
+    found by Bron-Kerbosch with pivoting on bitsets local to the branch
+  '''
+  nbrs = neighbors[v]
+  if not nbrs:
+    if min_size <= 1:
+      yield [v]
+    return
+  # local ids: the later neighbors (P) first, then the earlier ones (X)
+  later = [w for w in nbrs if position[w] > position[v]]
+  if 1 + len(later) < min_size:
+    return
+  local = later + [w for w in nbrs if position[w] < position[v]]
+  index = {w: i for i, w in enumerate(local)}
+  adj = []
+  for w in local:
+    bits = 0
+    for x in neighbors[w]:
+      i = index.get(x)
+      if i is not None:
+        bits |= 1 << i
+    adj.append(bits)
+  P = (1 << len(later)) - 1
+  X = ((1 << len(local)) - 1) ^ P
+  if not P:
+    return
+
+  def candidates(P, X):
+    # the vertices of P not adjacent to a pivot maximizing |P & N(pivot)|
+    best, pivot = -1, 0
+    PX = P | X
+    while PX:
+      low = PX & -PX
+      count = bin(P & adj[low.bit_length() - 1]).count('1')
+      if count > best:
+        best, pivot = count, low.bit_length() - 1
+      PX ^= low
+    return P & ~adj[pivot]
+
+  R = [v]
+  stack = [[P, X, candidates(P, X)]]
+  while stack:
+    frame = stack[-1]
+    P, X, todo = frame
+    if not todo:
+      stack.pop()
+      R.pop()
+      continue
+    low = todo & -todo
+    q = low.bit_length() - 1
+    frame[0] = P ^ low
+    frame[1] = X | low
+    frame[2] = todo ^ low
+    P_q, X_q = P & adj[q], X & adj[q]
+    if not P_q:
+      if not X_q and len(R) + 1 >= min_size:
+        yield R + [local[q]]
+    elif len(R) + 1 + bin(P_q).count('1') >= min_size:
+      R.append(local[q])
+      stack.append([P_q, X_q, candidates(P_q, X_q)])
+
+def _init_worker(neighbors, position):
+  global _worker_neighbors, _worker_position
+  _worker_neighbors, _worker_position = neighbors, position
+
+def _clique_worker(vertices, min_size):
+  cliques = []
+  for v in vertices:
+    cliques.extend(_branch_cliques(_worker_neighbors, _worker_position, v, min_size))
+  return cliques
+
+def iter_cliques(neighbors, min_size=1, workers=None):
+  '''
+    generate the maximal cliques of an undirected graph given as a list of
+    neighbor sets (without self-loops) over vertex ids
+
+    the top-level branches follow a degeneracy order, so each one only
+    searches the neighbors of its vertex; with workers > 1 they are split
+    over a process pool and cliques are yielded chunk by chunk
+  '''
+  _, order = core_decomposition([len(nbrs) for nbrs in neighbors], neighbors.__getitem__)
+  position = [0] * len(neighbors)
+  for i, v in enumerate(order):
+    position[v] = i
+  if not workers or workers <= 1 or len(order) <= 1:
+    for v in order:
+      yield from _branch_cliques(neighbors, position, v, min_size)
+    return
+  # small interleaved chunks balance the work and keep results streaming
+  k = min(len(order), workers * 4)
+  chunks = [order[i::k] for i in range(k)]
+  with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(neighbors, position)) as executor:
+    for cliques in executor.map(_clique_worker, chunks, [min_size] * k):
+      yield from cliques
@@ -0,0 +1,76 @@
+def core_decomposition(degrees, neighbors):
+  '''
+    Batagelj-Zaversnik bucket algorithm in O(V + E)
+
+    degrees: list of vertex degrees (without self-loops)
+    neighbors(v): the vertex ids whose degree drops by one per occurrence
+    when v is removed
+
+    returns the core numbers and a degeneracy ordering (the removal order,
+    every vertex has minimum remaining degree when it is removed)
+  '''
+  n = len(degrees)
+  core = list(degrees)
+  md = max(core, default=0)
+  # bin[d]: start of the block of vertices of degree d in vert
+  bin = [0] * (md + 1)
+  for d in core:
+    bin[d] += 1
+  start = 0
+  for d in range(md + 1):
+    bin[d], start = start, start + bin[d]
+  pos = [0] * n
+  vert = [0] * n
+  for v in range(n):
+    pos[v] = bin[core[v]]
+    vert[pos[v]] = v
+    bin[core[v]] += 1
+  for d in range(md, 0, -1):
+    bin[d] = bin[d - 1]
+  bin[0] = 0
+  for i in range(n):
+    v = vert[i]
+    cv = core[v]
+    for u in neighbors(v):
+      du = core[u]
+      if du > cv:
+        # move u to the front of its block, then shrink the block
+        pu, pw = pos[u], bin[du]
+        w = vert[pw]
+        if u != w:
+          pos[u], pos[w] = pw, pu
+          vert[pu], vert[pw] = w, u
+        bin[du] += 1
+        core[u] = du - 1
+  return core, vert
+
+def csr_core_decomposition(csr, mode='all'):
+  '''
+    core numbers and degeneracy ordering of a CSRGraph; on directed graphs
+    mode picks the degree: 'in', 'out' or 'all' (in + out); self-loops are
+    ignored
+  '''
+  if mode not in ('in', 'out', 'all'):
+    raise ValueError(f'Unknown degree mode {mode}.')
+  n = len(csr)
+  offsets, targets = csr.offsets, csr.targets
+  r_offsets, r_targets = csr.r_offsets, csr.r_targets
+
+  def adjacency(offsets, targets):
+    return [[w for w in targets[offsets[v]:offsets[v+1]] if w != v] for v in range(n)]
+
+  if csr.undirected:
+    lists = adjacency(offsets, targets)
+    degrees = [len(nbrs) for nbrs in lists]
+  else:
+    out_lists = adjacency(offsets, targets)
+    in_lists = adjacency(r_offsets, r_targets)
+    if mode == 'out':
+      # removing v lowers the out-degree of the vertices pointing to it
+      lists, degrees = in_lists, [len(nbrs) for nbrs in out_lists]
+    elif mode == 'in':
+      lists, degrees = out_lists, [len(nbrs) for nbrs in in_lists]
+    else:
+      lists = [a + b for a, b in zip(out_lists, in_lists)]
+      degrees = [len(nbrs) for nbrs in lists]
+  return core_decomposition(degrees, lists.__getitem__)
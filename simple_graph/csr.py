@@ -0,0 +1,410 @@
+from array import array
+from math import inf
+from heapq import heappush, heappop
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+class CSRGraph:
+  '''
+    immutable compressed-sparse-row snapshot of a Graph
+
+    vertices are renumbered densely: labels[i] is the label of vertex i and
+    index[label] is its id. the neighbors of vertex i are
+    targets[offsets[i]:offsets[i+1]], with the matching weights and edge ids
+    in the same slots. edge ids refer to sources/destinations, which hold
+    the stored edges in the order of Graph.edges.
+    for directed graphs the reverse adjacency is kept in r_offsets,
+    r_targets, r_weights and r_edge_ids; for undirected graphs they are the
+    forward arrays.
+    vertex_attrs and edge_attrs map an attribute name to a (values, mask)
+    column, mask[i] tells whether element i has the attribute (None: all do).
+  '''
+
+  def __init__(self, labels, undirected, offsets, targets, weights, edge_ids, sources, destinations, reverse=None, unit_weights=False, default_weight=1.0, vertex_attrs=None, edge_attrs=None):
+    self.labels = labels
+    self.vertex_attrs = vertex_attrs if vertex_attrs is not None else {}
+    self.edge_attrs = edge_attrs if edge_attrs is not None else {}
+    self.unit_weights = unit_weights
+    self.default_weight = default_weight
+    self.index = {v: i for i, v in enumerate(labels)}
+    self.undirected = undirected
+    self.offsets = offsets
+    self.targets = targets
+    self.weights = weights
+    self.edge_ids = edge_ids
+    self.sources = sources
+    self.destinations = destinations
+    if reverse is None:
+      reverse = (offsets, targets, weights, edge_ids)
+    self.r_offsets, self.r_targets, self.r_weights, self.r_edge_ids = reverse
+    self._buffer = None # keeps a memory map alive for arrays opened from a file
+
+  @classmethod
+  def from_graph(cls, graph):
+    labels = list(graph.V._vertices)
+    index = {v: i for i, v in enumerate(labels)}
+    E = graph.E
+    default = graph.default_e_weight
+    sources = array('q')
+    destinations = array('q')
+    edge_weights = array('d')
+    store = E._store
+    eid = {}
+    edge_dicts = []
+    for u, nbrs in E._neighbors.items():
+      for v, slot in nbrs.items():
+        eid[slot] = len(sources)
+        edge_dicts.append(store.to_dict(slot))
+        sources.append(index[u])
+        destinations.append(index[v])
+        edge_weights.append(store.weight(slot, default))
+
+    def build(first, second):
+      offsets = array('q', [0])
+      targets = array('q')
+      weights = array('d')
+      edge_ids = array('q')
+      for u in labels:
+        for adjacency in (first, second):
+          if adjacency is None or u not in adjacency:
+            continue
+          for v, slot in adjacency[u].items():
+            k = eid[slot]
+            targets.append(index[v])
+            weights.append(edge_weights[k])
+            edge_ids.append(k)
+        offsets.append(len(targets))
+      return offsets, targets, weights, edge_ids
+
+    if graph.undirected:
+      forward = build(E._neighbors, E._reverse_neighbors)
+      reverse = None
+    else:
+      forward = build(E._neighbors, None)
+      reverse = build(E._reverse_neighbors, None)
+    vertex_attrs = _columns([graph.V._store.to_dict(graph.V._vertices[v]) for v in labels])
+    edge_attrs = _columns(edge_dicts)
+    return cls(labels, graph.undirected, *forward, sources, destinations, reverse=reverse,
+               unit_weights=graph._unit_weights, default_weight=graph.default_e_weight,
+               vertex_attrs=vertex_attrs, edge_attrs=edge_attrs)
+
+  def __len__(self):
+    return len(self.labels)
+
+  def __repr__(self):
+    return f'CSRGraph(vertices={len(self.labels)}, edges={len(self.sources)}, undirected={self.undirected})'
+
+  @property
+  def number_of_edges(self):
+    return len(self.sources)
+
+  def as_numpy(self):
+    '''
+      zero-copy NumPy views of the adjacency arrays
+    '''
+    if np is None:
+      raise ImportError('numpy is required for as_numpy().')
+    dtypes = {'q': np.int64, 'd': np.float64}
+    arrays = {}
+    for name in ('offsets', 'targets', 'weights', 'edge_ids', 'sources', 'destinations'):
+      buffer = memoryview(getattr(self, name))
+      arrays[name] = np.frombuffer(buffer, dtype=dtypes[buffer.format])
+    return arrays
+
+  def _attributes(self, columns, i):
+    return {name: values[i] for name, (values, mask) in columns.items() if mask is None or mask[i]}
+
+  @property
+  def vertices(self):
+    return list(self.labels)
+
+  @property
+  def edges(self):
+    return [self.edge_key(k) for k in range(len(self.sources))]
+
+  @property
+  def detailed_vertices(self):
+    return [(v, self._attributes(self.vertex_attrs, i)) for i, v in enumerate(self.labels)]
+
+  @property
+  def detailed_edges(self):
+    return [(*self.edge_key(k), self._attributes(self.edge_attrs, k)) for k in range(len(self.sources))]
+
+  def to_dict(self):
+    return {'V': self.detailed_vertices, 'E': self.detailed_edges}
+
+  def to_graph(self, **kwargs):
+    '''
+      a mutable Graph with the same vertices, edges and attributes
+    '''
+    from .graph import Graph
+    graph = Graph(undirected=self.undirected, default_e_weight=self.default_weight, **kwargs)
+    self.fill(graph.V, graph.E)
+    graph.has_self_link = graph.E.self_loops > 0
+    return graph
+
+  def fill(self, V, E):
+    '''
+      load the vertices, edges and attributes into empty Vertices and Edges
+      with their bulk paths: vertex i and edge k take slot i and k, so the
+      attribute columns are copied whole
+    '''
+    labels = self.labels
+    V.add_many(labels)
+    V._store.fill_columns(self.vertex_attrs)
+    sources = [labels[i] for i in self.sources]
+    targets = [labels[i] for i in self.destinations]
+    E.add_many(sources, targets)
+    E._store.fill_columns(self.edge_attrs)
+    if 'weight' in self.edge_attrs:
+      weights, mask = self.edge_attrs['weight']
+      if mask is not None:
+        keep = [k for k in range(len(sources)) if mask[k]]
+        sources = [sources[k] for k in keep]
+        targets = [targets[k] for k in keep]
+        weights = [weights[k] for k in keep]
+      E._account_many(sources, targets, weights)
+
+  def neighbors(self, v):
+    i = self.index[v]
+    labels = self.labels
+    return [labels[j] for j in self.targets[self.offsets[i]:self.offsets[i+1]]]
+
+  def reverse_neighbors(self, v):
+    i = self.index[v]
+    labels = self.labels
+    return [labels[j] for j in self.r_targets[self.r_offsets[i]:self.r_offsets[i+1]]]
+
+  def edge_key(self, k):
+    labels = self.labels
+    return (labels[self.sources[k]], labels[self.destinations[k]])
+
+  '''
+  -------------------connect-------------------------
+  '''
+
+  def connected_components(self):
+    offsets, targets, labels = self.offsets, self.targets, self.labels
+    n = len(labels)
+    seen = bytearray(n)
+    components = []
+    for s in range(n):
+      if seen[s]:
+        continue
+      # on directed graphs the search follows out-edges only, so a later
+      # component may reach vertices that an earlier one already holds
+      reached = seen if self.undirected else bytearray(n)
+      reached[s] = 1
+      component = [s]
+      stack = [s]
+      while stack:
+        v = stack.pop()
+        for w in targets[offsets[v]:offsets[v+1]]:
+          if not reached[w]:
+            reached[w] = 1
+            component.append(w)
+            stack.append(w)
+      if not self.undirected:
+        for v in component:
+          seen[v] = 1
+      components.append(list({labels[v] for v in component}))
+    return components
+
+  def find_isolated_vertices(self):
+    offsets, r_offsets = self.offsets, self.r_offsets
+    return [v for i, v in enumerate(self.labels)
+            if offsets[i] == offsets[i+1] and r_offsets[i] == r_offsets[i+1]]
+
+  '''
+  -------------------betweenness-------------------------
+  '''
+
+  def _bfs(self, s, instrumentation=None):
+    offsets, targets, edge_ids = self.offsets, self.targets, self.edge_ids
+    n = len(self.labels)
+    S = [s]
+    P = [[] for _ in range(n)]
+    sigma = [0.0] * n
+    D = [None] * n
+    sigma[s] = 1.0
+    D[s] = 0
+    frontier = [s]
+    d = 0
+    while frontier:
+      if instrumentation is not None:
+        instrumentation.observe('bfs_frontier', len(frontier))
+      d += 1
+      next_frontier = []
+      for v in frontier:
+        sigma_v = sigma[v]
+        for k in range(offsets[v], offsets[v+1]):
+          w = targets[k]
+          if D[w] is None:
+            D[w] = d
+            next_frontier.append(w)
+          if D[w] == d:
+            sigma[w] += sigma_v
+            P[w].append((v, edge_ids[k]))
+      S.extend(next_frontier)
+      frontier = next_frontier
+    if instrumentation is not None:
+      instrumentation.count('bfs_visited', len(S))
+      instrumentation.count('relaxations', sum(offsets[v+1] - offsets[v] for v in S))
+    return S, P, sigma, D
+
+  def _dijkstra(self, s, instrumentation=None):
+    if self.unit_weights:
+      return self._bfs(s, instrumentation)
+    offsets, targets, weights, edge_ids = self.offsets, self.targets, self.weights, self.edge_ids
+    n = len(self.labels)
+    S = []
+    P = [None] * n
+    sigma = [0.0] * n
+    D = [None] * n
+    seen = [inf] * n
+    sigma[s] = 1.0
+    seen[s] = 0
+    P[s] = []
+    Q = [(0, s, s)]
+    pushes = 1
+    while Q:
+      dist, pre, v = heappop(Q)
+      if D[v] is not None:
+        continue
+      sigma[v] += sigma[pre]
+      S.append(v)
+      D[v] = dist
+      for k in range(offsets[v], offsets[v+1]):
+        w = targets[k]
+        vw_dist = dist + weights[k]
+        if D[w] is not None:
+          continue
+        if vw_dist < seen[w]:
+          seen[w] = vw_dist
+          heappush(Q, (vw_dist, v, w))
+          pushes += 1
+          sigma[w] = 0.0
+          P[w] = [(v, edge_ids[k])]
+        elif vw_dist == seen[w]:
+          sigma[w] += sigma[v]
+          P[w].append((v, edge_ids[k]))
+    if instrumentation is not None:
+      instrumentation.count('dijkstra_settled', len(S))
+      instrumentation.count('heap_pushes', pushes)
+      instrumentation.count('relaxations', sum(offsets[v+1] - offsets[v] for v in S))
+    return S, P, sigma, D
+
+  def _accumulate(self, vertex_betweenness, edge_betweenness, S, P, sigma, s):
+    delta = [0.0] * len(self.labels)
+    while S:
+      w = S.pop()
+      coeff = (1 + delta[w]) / sigma[w]
+      for v, k in P[w]:
+        c = sigma[v] * coeff
+        edge_betweenness[k] += c
+        delta[v] += c
+      if w != s:
+        vertex_betweenness[w] += delta[w]
+
+  def _centrality_sums(self, sources, metrics, squares=False, instrumentation=None):
+    '''
+      the CSR counterpart of Graph._centrality_sums, keyed by labels; the
+      searches report to instrumentation like the graph's own
+    '''
+    n = len(self.labels)
+    labels, index = self.labels, self.index
+    vertex_betweenness = [0.0] * n
+    edge_betweenness = [0.0] * len(self.sources)
+    if squares:
+      vertex_squares = [0.0] * n
+      edge_squares = [0.0] * len(self.sources)
+    closeness = {}
+    harmonic = {}
+    for label in sources:
+      s = index[label]
+      S, P, sigma, D = self._dijkstra(s, instrumentation)
+      if 'closeness' in metrics or 'harmonic' in metrics:
+        reached = [d for d in D if d is not None]
+        if self.unit_weights and self.default_weight != 1:
+          reached = [d * self.default_weight for d in reached]
+        total = sum(reached)
+        r = len(reached) - 1
+        closeness[label] = r / total * r / (n - 1) if total > 0 else 0.0
+        harmonic[label] = sum(1 / d for d in reached if d > 0)
+      if squares:
+        local_vertex = [0.0] * n
+        local_edge = [0.0] * len(self.sources)
+        self._accumulate(local_vertex, local_edge, S, P, sigma, s)
+        for local, total, total_squares in ((local_vertex, vertex_betweenness, vertex_squares), (local_edge, edge_betweenness, edge_squares)):
+          for i, c in enumerate(local):
+            if c:
+              total[i] += c
+              total_squares[i] += c * c
+      else:
+        self._accumulate(vertex_betweenness, edge_betweenness, S, P, sigma, s)
+
+    result = {'closeness': closeness, 'harmonic': harmonic,
+              'vertex_betweenness': dict(zip(labels, vertex_betweenness)),
+              'edge_betweenness': {self.edge_key(k): b for k, b in enumerate(edge_betweenness)}}
+    if squares:
+      squares = {'vertex_betweenness': dict(zip(labels, vertex_squares)),
+                 'edge_betweenness': {self.edge_key(k): b for k, b in enumerate(edge_squares)}}
+    return {metric: result[metric] for metric in metrics}, squares
+
+  '''
+  -------------------cliques-------------------------
+  '''
+
+  def max_cliques(self):
+    n = len(self.labels)
+    if n == 0:
+      return []
+    offsets, targets, labels = self.offsets, self.targets, self.labels
+    N = [{w for w in targets[offsets[v]:offsets[v+1]] if w != v} for v in range(n)]
+    cliques = []
+    Q = [None]
+    PX = set(range(n))
+    P = set(range(n))
+    stack = []
+    while True:
+      pivot = max(PX, key=lambda u: len(P & N[u]))
+      R = P - N[pivot]
+      if R:
+        q = R.pop()
+        P.remove(q)
+        Q[-1] = q
+        N_q = N[q]
+        PX_q = PX & N_q
+        if not PX_q:
+          cliques.append([labels[v] for v in Q])
+        else:
+          P_q = P & N_q
+          if P_q:
+            stack.append((PX, P))
+            Q.append(None)
+            PX = PX_q
+            P = P_q
+      else:
+        Q.pop()
+        if stack:
+          PX, P = stack.pop()
+        else:
+          break
+    return cliques
+
+def _columns(dicts):
+  '''
+    turn a list of attribute dicts into (values, mask) columns
+  '''
+  columns = {}
+  for i, attributes in enumerate(dicts):
+    for name, value in attributes.items():
+      if name not in columns:
+        columns[name] = ([None] * len(dicts), bytearray(len(dicts)))
+      values, mask = columns[name]
+      values[i] = value
+      mask[i] = 1
+  return {name: (values, None if all(mask) else mask) for name, (values, mask) in columns.items()}
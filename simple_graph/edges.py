@@ -1,94 +1,462 @@
 from collections import defaultdict
-class Edge:
+from .attributes import AttributeStore, Element
+from .sharing import CopyOnWrite, read_only_class
+class Edge(Element):
+  '''
+    view of the attributes of one edge, e.g. edge.weight
+  '''
+  __slots__ = ('_ends',)
 
-  def __init__(self, **kwargs):
-    for key, value in kwargs.items():
-      if key == 'weight':
-        self.__dict__[key] = float(value)
-      else:
-        self.__dict__[key] = value
+  def __init__(self, store, slot, edges=None, ends=None):
+    super().__init__(store, slot, edges)
+    object.__setattr__(self, '_ends', ends)
+
+  def _set(self, name, value):
+    # weight changes go through Edges to keep the vertex strengths current
+    if name == 'weight' and self._owner is not None:
+      self._owner.set_weight(*self._ends, value)
+    else:
+      super()._set(name, value)
+
+  def _delete(self, name):
+    edges = self._owner
+    if name == 'weight' and edges is not None and self._store.has_weight[self._slot]:
+      if edges._pending:
+        edges._write()
+      edges._account(*self._ends, self._slot, -1)
+    super()._delete(name)
     
+_EMPTY = {}
+
+class NeighborView:
+  '''
+    read-only view of the neighbors of a vertex over the adjacency dicts,
+    it is iterable, sized and supports membership tests without copying.
+    like dict views it must not be iterated while the graph changes
+  '''
+  __slots__ = ('_first', '_second')
+
+  def __init__(self, first, second=_EMPTY):
+    self._first = first
+    self._second = second
+
+  def __iter__(self):
+    yield from self._first
+    yield from self._second
+
+  def __len__(self):
+    return len(self._first) + len(self._second)
+
+  def __contains__(self, v):
+    return v in self._first or v in self._second
+
+  def __eq__(self, other):
+    if isinstance(other, (NeighborView, list, tuple)):
+      return list(self) == list(other)
+    return NotImplemented
+
   def __repr__(self):
-    return str(self.to_dict())
-    
-  def to_dict(self):
-    return self.__dict__
-    
-class Edges:
+    return repr(list(self))
+
+  def count(self, v):
+    return (v in self._first) + (v in self._second)
+
+class Edges(CopyOnWrite):
+  _transient = ('_owned', 'on_write')
   
   def __init__(self, undirected=True, verbose=False):
     self.undirected = undirected
     self.verbose = verbose
+    self.on_write = None # weak reference to the graph's hook for writes through Edge proxies
     self.clear()
   
   def clear(self):
     self._neighbors = defaultdict(dict)
     self._reverse_neighbors = defaultdict(dict)
+    self._store = AttributeStore() # edge attributes, the adjacency holds slots
+    self._count = 0
+    self.self_loops = 0
+    # explicit weights summed per vertex and how many edges carry one, the
+    # other edges weigh the graph default; on undirected graphs 'out' holds
+    # the edges stored under the smaller end (self-loops) and 'in' the others
+    self._out_sum = defaultdict(float)
+    self._out_weighted = defaultdict(int)
+    self._in_sum = defaultdict(float)
+    self._in_weighted = defaultdict(int)
+    self._loop_sum = 0.0
+    self._loop_weighted = 0
+    self._owned = None # vertices whose (out, in) neighbor maps were copied since the last share()
+    self._forget()
+
+  def share(self):
+    '''
+      an O(1) read-only copy sharing the storage, see CopyOnWrite; the
+      neighbor maps are copied here one vertex at a time as they change
+    '''
+    E = FrozenEdges.__new__(FrozenEdges)
+    E.__dict__.update(self.__dict__)
+    E._store = self._store.share()
+    E._owned = None
+    E._forget()
+    self._track(E)
+    return E
+
+  def _detach(self):
+    self._neighbors = defaultdict(dict, self._neighbors)
+    self._reverse_neighbors = defaultdict(dict, self._reverse_neighbors)
+    for name in ('_out_sum', '_out_weighted', '_in_sum', '_in_weighted'):
+      counter = getattr(self, name)
+      setattr(self, name, defaultdict(counter.default_factory, counter))
+    self._owned = (set(), set())
+
+  def _own(self, adjacency, owned, u):
+    # the neighbor map of u in adjacency, copied first if a snapshot shares it
+    nbrs = adjacency[u]
+    if u not in owned:
+      if self._shared():
+        nbrs = adjacency[u] = dict(nbrs)
+        owned.add(u)
+      else:
+        self._owned = None
+    return nbrs
+
+  def _out(self, u):
+    if self._owned is None:
+      return self._neighbors[u]
+    return self._own(self._neighbors, self._owned[0], u)
+
+  def _in(self, v):
+    if self._owned is None:
+      return self._reverse_neighbors[v]
+    return self._own(self._reverse_neighbors, self._owned[1], v)
+
+  def __len__(self):
+    return self._count
+
+  def out_degree(self, u):
+    nbrs = self._neighbors.get(u)
+    return len(nbrs) if nbrs else 0
+
+  def in_degree(self, u):
+    nbrs = self._reverse_neighbors.get(u)
+    return len(nbrs) if nbrs else 0
+
+  def has_self_loop(self, u):
+    nbrs = self._neighbors.get(u)
+    return bool(nbrs) and u in nbrs
+
+  def degree(self, u):
+    '''
+      number of edge ends at u, a self-loop counts twice; on directed graphs
+      only out-edges are counted, so a self-loop and one other out-edge
+      give degree 3 (as Graph.degree always has)
+    '''
+    degree = self.out_degree(u) + self.has_self_loop(u)
+    if self.undirected:
+      degree += self.in_degree(u)
+    return degree
+
+  def _account(self, u, v, slot, sign):
+    '''
+      add (sign 1) or remove (sign -1) the explicit weight of the stored
+      edge (u, v) from the strength counters
+    '''
+    store = self._store
+    if not store.has_weight[slot]:
+      return
+    w = sign * store.weights[slot]
+    self._out_sum[u] += w
+    self._out_weighted[u] += sign
+    if u == v:
+      self._loop_sum += w
+      self._loop_weighted += sign
+      if self.undirected:
+        return
+    self._in_sum[v] += w
+    self._in_weighted[v] += sign
+
+  def set_weight(self, u, v, w):
+    if self._pending:
+      self._write()
+    if self.undirected and u > v:
+      u, v = v, u
+    slot = self.slot(u, v)
+    if slot is None:
+      return
+    self._account(u, v, slot, -1)
+    self._store.set(slot, 'weight', w)
+    self._account(u, v, slot, 1)
+
+  def strength(self, u, mode, default):
+    '''
+      weighted degree of u, edges without a weight count as default.
+      directed: 'in', 'out' or any other mode for both; undirected: the
+      weight of the incident edges (self-loops once) for 'in' and 'out',
+      twice that otherwise
+    '''
+    if self.undirected:
+      weight = self._out_sum.get(u, 0.0) + self._in_sum.get(u, 0.0)
+      unweighted = self.out_degree(u) + self.in_degree(u) - self._out_weighted.get(u, 0) - self._in_weighted.get(u, 0)
+      if unweighted:
+        weight += unweighted * default
+      return weight if mode in ('in', 'out') else 2 * weight
+    weight = 0.0
+    if mode != 'out':
+      weight += self._in_sum.get(u, 0.0)
+      unweighted = self.in_degree(u) - self._in_weighted.get(u, 0)
+      if unweighted:
+        weight += unweighted * default
+    if mode != 'in':
+      weight += self._out_sum.get(u, 0.0)
+      unweighted = self.out_degree(u) - self._out_weighted.get(u, 0)
+      if unweighted:
+        weight += unweighted * default
+    return weight
+
+  def total_strength(self, mode, default):
+    '''
+      the sum of strength(u, mode, default) over all vertices
+    '''
+    store = self._store
+    weight = store.weight_total
+    unweighted = self._count - store.weighted
+    if unweighted:
+      weight += unweighted * default
+    if self.undirected:
+      # every edge counts at both ends, a self-loop once
+      weight *= 2
+      weight -= self._loop_sum
+      unweighted = self.self_loops - self._loop_weighted
+      if unweighted:
+        weight -= unweighted * default
+      return weight if mode in ('in', 'out') else 2 * weight
+    return weight if mode in ('in', 'out') else 2 * weight
+
+  @property
+  def has_weights(self):
+    return self._store.weighted > 0
     
   @property
   def items(self):
     return [(u, v) for u in self._neighbors for v in self._neighbors[u]]
+
+  def __iter__(self):
+    for u, nbrs in self._neighbors.items():
+      for v in nbrs:
+        yield (u, v)
   
   def neighbors(self, u):
-    neighbors = []
-    if u in self._neighbors:
-      neighbors += list(self._neighbors[u].keys())
-    if self.undirected and u in self._reverse_neighbors:
-      neighbors += list(self._reverse_neighbors[u].keys())
-    return neighbors
+    if self.undirected:
+      return NeighborView(self._neighbors.get(u, _EMPTY), self._reverse_neighbors.get(u, _EMPTY))
+    return NeighborView(self._neighbors.get(u, _EMPTY))
   
   def reverse_neighbors(self, u):
-    reverse_neighbors = []
-    if u in self._reverse_neighbors:
-      reverse_neighbors += list(self._reverse_neighbors[u].keys())
-    if self.undirected and u in self._neighbors:
-      reverse_neighbors += list(self._neighbors[u].keys())
-    return reverse_neighbors
+    if self.undirected:
+      return NeighborView(self._reverse_neighbors.get(u, _EMPTY), self._neighbors.get(u, _EMPTY))
+    return NeighborView(self._reverse_neighbors.get(u, _EMPTY))
   
-  def __getitem__(self, items):
-    u, v = items[0], items[1]
+  def slot(self, u, v):
     if self.undirected and u > v:
       u, v = v, u
     if u not in self._neighbors:
       return None
     return self._neighbors[u].get(v, None)
+
+  def __getitem__(self, items):
+    u, v = items[0], items[1]
+    if self.undirected and u > v:
+      u, v = v, u
+    slot = self.slot(u, v)
+    return None if slot is None else Edge(self._store, slot, self, (u, v))
+
+  def weight(self, u, v, default, absent):
+    slot = self.slot(u, v)
+    return absent if slot is None else self._store.weight(slot, default)
   
   def remove(self, u, v):
     if self.undirected and u > v:
       u, v = v, u
-    if u not in self._neighbors:
+    if u not in self._neighbors or v not in self._neighbors[u]:
       return
-    try:
-      self._neighbors[u].pop(v)
-      self._reverse_neighbors[v].pop(u)
-    except:
-      pass
+    if self._pending:
+      self._write()
+    slot = self._out(u).pop(v)
+    if v in self._reverse_neighbors and u in self._reverse_neighbors[v]:
+      self._in(v).pop(u)
+    self._account(u, v, slot, -1)
+    self._store.release(slot)
+    self._count -= 1
+    if u == v:
+      self.self_loops -= 1
     
   def remove_vertex(self, x):
     '''
       remove a vertex needs to remove the related edges 
     '''
-    for n in self._neighbors[x]:
+    if self._pending:
+      self._write()
+    for n, slot in self._neighbors[x].items():
+      self._account(x, n, slot, -1)
+      self._store.release(slot)
+      self._count -= 1
+      if n == x:
+        self.self_loops -= 1
       # remove link in reverse_neighors
       if n in self._reverse_neighbors and x in self._reverse_neighbors[n]:
-        self._reverse_neighbors[n].pop(x)
+        self._in(n).pop(x)
     self._neighbors.pop(x)
     for n in self._reverse_neighbors[x]:
       # remove link in neighbors
       if n in self._neighbors and x in self._neighbors[n]:
-        self._neighbors[n].pop(x, None)
+        slot = self._out(n).pop(x)
+        self._account(n, x, slot, -1)
+        self._store.release(slot)
+        self._count -= 1
     self._reverse_neighbors.pop(x)
+    for counter in (self._out_sum, self._out_weighted, self._in_sum, self._in_weighted):
+      counter.pop(x, None)
+      
+  def add_many(self, sources, targets, weights=None, attributes=None):
+    '''
+      add the edges (sources[i], targets[i]) in one pass, with optional
+      parallel weights and attribute dicts; a repeated pair keeps the
+      attributes given last, like repeated add calls
+    '''
+    if self._pending:
+      self._write()
+    neighbors, reverse_neighbors = self._neighbors, self._reverse_neighbors
+    shared = self._owned is not None
+    store = self._store
+    undirected = self.undirected
+    # new edges take consecutive fresh slots, the store grows once at the end
+    start = slot = len(store.weights)
+    loops = 0
+    existing = []
+    # slot -> stored (u, v) of the repeated pairs, and of the new edges when
+    # their weights come from attribute dicts
+    ends = {}
+    track = attributes is not None
+    for i, (u, v) in enumerate(zip(sources, targets)):
+      if undirected and u > v:
+        u, v = v, u
+      nbrs = self._out(u) if shared else neighbors[u]
+      if v in nbrs:
+        existing.append((nbrs[v], i))
+        ends[nbrs[v]] = (u, v)
+        continue
+      if track:
+        ends[slot] = (u, v)
+      nbrs[v] = slot
+      slot += 1
+      if u == v:
+        loops += 1
+        if undirected:
+          continue
+      (self._in(v) if shared else reverse_neighbors[v])[u] = slot - 1
+    added = slot - start
+    store.extend(added)
+    self._count += added
+    self.self_loops += loops
+    if weights is None and attributes is None and not existing:
+      return
+    if attributes is None and weights is not None:
+      self._add_weights(sources, targets, weights, start, existing, ends)
+      return
+    # second pass for attributes, a repeated pair takes its last occurrence
+    if existing:
+      slots = []
+      repeated = dict((i, slot) for slot, i in existing)
+      new_slot = start
+      for i in range(len(sources)):
+        if i in repeated:
+          slots.append(repeated[i])
+        else:
+          slots.append(new_slot)
+          new_slot += 1
+      last = dict(zip(slots, range(len(slots))))
+      for slot, _ in existing:
+        self._account(*ends[slot], slot, -1)
+        store.reset(slot)
+      slots = list(last)
+      indices = list(last.values())
+    else:
+      slots = range(start, slot)
+      indices = range(len(slots))
+    if weights is not None:
+      store.set_weights(slots, [weights[i] for i in indices])
+    if attributes is not None:
+      for slot, i in zip(slots, indices):
+        if attributes[i]:
+          store.update(slot, attributes[i])
+    for slot, (u, v) in ends.items():
+      self._account(u, v, slot, 1)
       
+  def _add_weights(self, sources, targets, weights, start, existing, ends):
+    # the weights of an add_many call without attribute dicts: the fresh
+    # slots are consecutive and filled at once, the repeated pairs are
+    # re-weighted in order so the last occurrence wins
+    if existing:
+      repeated = {i for _, i in existing}
+      keep = [i for i in range(len(weights)) if i not in repeated]
+      sources = [sources[i] for i in keep]
+      targets = [targets[i] for i in keep]
+      fresh = [weights[i] for i in keep]
+    else:
+      fresh = weights
+    store = self._store
+    store.fill_weights(start, fresh)
+    self._account_many(sources, targets, store.weights[start:start+len(fresh)])
+    for slot, i in existing:
+      u, v = ends[slot]
+      self._account(u, v, slot, -1)
+      store.reset(slot)
+      store.set(slot, 'weight', weights[i])
+      self._account(u, v, slot, 1)
+
+  def _account_many(self, sources, targets, weights):
+    # _account(u, v, slot, 1) for new weighted edges, in one pass
+    undirected = self.undirected
+    out_sum, out_weighted = self._out_sum, self._out_weighted
+    in_sum, in_weighted = self._in_sum, self._in_weighted
+    loop_sum = 0.0
+    loops = 0
+    for u, v, w in zip(sources, targets, weights):
+      if undirected and u > v:
+        u, v = v, u
+      out_sum[u] += w
+      out_weighted[u] += 1
+      if u == v:
+        loop_sum += w
+        loops += 1
+        if undirected:
+          continue
+      in_sum[v] += w
+      in_weighted[v] += 1
+    self._loop_sum += loop_sum
+    self._loop_weighted += loops
+
   def add(self, u, v, **kwargs):
+    if self._pending:
+      self._write()
     if self.undirected and u > v:
       u, v = v, u
-    edge = self[u, v]
-    if edge:
-      if self.verbose:
-        print(f'Edge ({u},{v}) already exists.')
+    slot = self.slot(u, v)
+    if slot is not None:
+      if self.verbose: # keep the existing attributes
         return
-    edge = Edge(**kwargs)
-    self._neighbors[u][v] = edge
+      self._account(u, v, slot, -1)
+      self._store.reset(slot)
+      self._store.update(slot, kwargs)
+      self._account(u, v, slot, 1)
+      return
+    slot = self._store.allocate(kwargs)
+    self._account(u, v, slot, 1)
+    self._out(u)[v] = slot
+    self._count += 1
+    if u == v:
+      self.self_loops += 1
     if u == v and self.undirected:
       return
-    self._reverse_neighbors[v][u] = edge
\ No newline at end of file
+    self._in(v)[u] = slot
+
+FrozenEdges = read_only_class(Edges, 'FrozenEdges')
@@ -0,0 +1,162 @@
+import random
+from math import log, isqrt
+from collections import defaultdict
+
+def gnp_edges(n, p, undirected=True, seed=None):
+  '''
+    Erdos-Renyi G(n, p): every pair is an edge with probability p, drawn by
+    skipping over the pairs between two successes with geometric jumps
+    (Batagelj and Brandes)
+  '''
+  rng = random.Random(seed)
+  sources, targets = [], []
+  if p <= 0 or n < 2:
+    return sources, targets
+  if p >= 1:
+    for u in range(n):
+      for v in range(u + 1 if undirected else 0, n):
+        if u != v:
+          sources.append(u)
+          targets.append(v)
+    return sources, targets
+  lp = log(1.0 - p)
+  if undirected:
+    v, w = 1, -1
+    while v < n:
+      w += 1 + int(log(1.0 - rng.random()) / lp)
+      while w >= v and v < n:
+        w -= v
+        v += 1
+      if v < n:
+        sources.append(w)
+        targets.append(v)
+  else:
+    # the n(n-1) ordered pairs without self-loops, u * (n-1) + j
+    k, total = -1, n * (n - 1)
+    while True:
+      k += 1 + int(log(1.0 - rng.random()) / lp)
+      if k >= total:
+        break
+      u, j = divmod(k, n - 1)
+      sources.append(u)
+      targets.append(j if j < u else j + 1)
+  return sources, targets
+
+def gnm_edges(n, m, undirected=True, seed=None):
+  '''
+    Erdos-Renyi G(n, m): m distinct pairs chosen uniformly at random
+  '''
+  rng = random.Random(seed)
+  total = n * (n - 1) // 2 if undirected else n * (n - 1)
+  if m > total:
+    raise ValueError(f'A graph with {n} vertices has at most {total} edges.')
+  sources, targets = [], []
+  for k in sorted(rng.sample(range(total), m)):
+    if undirected:
+      # k-th pair (u, v) with u < v, in order of v
+      v = (1 + isqrt(1 + 8 * k)) // 2
+      u = k - v * (v - 1) // 2
+    else:
+      u, v = divmod(k, n - 1)
+      if v >= u:
+        v += 1
+    sources.append(u)
+    targets.append(v)
+  return sources, targets
+
+def barabasi_albert_edges(n, m, seed=None):
+  '''
+    Barabasi-Albert preferential attachment: each new vertex links to m
+    distinct earlier vertices chosen with probability proportional to their
+    degree, the first new vertex to the m initial ones
+  '''
+  if m < 1 or m >= n:
+    raise ValueError('Barabasi-Albert graphs need 1 <= m < n.')
+  rng = random.Random(seed)
+  sources, targets = [], []
+  repeated = [] # every vertex once per edge end, for degree-biased draws
+  chosen = list(range(m))
+  for v in range(m, n):
+    for u in chosen:
+      sources.append(v)
+      targets.append(u)
+    repeated.extend(chosen)
+    repeated.extend([v] * m)
+    picked = set()
+    while len(picked) < m:
+      picked.add(rng.choice(repeated))
+    chosen = list(picked)
+  return sources, targets
+
+def rmat_edges(scale, edge_factor=16, a=0.57, b=0.19, c=0.19, seed=None):
+  '''
+    R-MAT (recursive Kronecker) graph over 2**scale vertices: each of the
+    edge_factor * 2**scale edges picks one quadrant of the adjacency matrix
+    per bit with probabilities a, b, c and 1-a-b-c; self-loops are dropped,
+    repeated edges are kept for the caller to merge
+  '''
+  if min(a, b, c) < 0 or a + b + c > 1:
+    raise ValueError('R-MAT needs non-negative a, b, c with a + b + c <= 1.')
+  rng = random.Random(seed)
+  ab, abc = a + b, a + b + c
+  sources, targets = [], []
+  for _ in range(edge_factor << scale):
+    u = v = 0
+    for _ in range(scale):
+      r = rng.random()
+      u <<= 1
+      v <<= 1
+      if r >= ab:
+        u |= 1
+        if r >= abc:
+          v |= 1
+      elif r >= a:
+        v |= 1
+    if u != v:
+      sources.append(u)
+      targets.append(v)
+  return sources, targets
+
+def random_regular_edges(n, d, seed=None):
+  '''
+    a random simple d-regular undirected graph, by pairing the d stubs of
+    every vertex at random and re-pairing the stubs that would give a
+    self-loop or a repeated edge; starts over on a dead end
+  '''
+  if d < 0 or d >= n or (n * d) % 2:
+    raise ValueError('Random regular graphs need 0 <= d < n and n * d even.')
+  rng = random.Random(seed)
+
+  def suitable(edges, left):
+    # can the leftover stubs still be paired without a repeated edge?
+    if not left:
+      return True
+    for u in left:
+      for v in left:
+        if u != v:
+          pair = (u, v) if u < v else (v, u)
+          if pair not in edges:
+            return True
+    return False
+
+  while True:
+    edges = set()
+    stubs = [v for v in range(n) for _ in range(d)]
+    while stubs:
+      left = defaultdict(int)
+      rng.shuffle(stubs)
+      pairs = iter(stubs)
+      for u, v in zip(pairs, pairs):
+        if u > v:
+          u, v = v, u
+        if u != v and (u, v) not in edges:
+          edges.add((u, v))
+        else:
+          left[u] += 1
+          left[v] += 1
+      if not suitable(edges, left):
+        break
+      stubs = [v for v, k in left.items() for _ in range(k)]
+    else:
+      edges = sorted(edges)
+      return [u for u, _ in edges], [v for _, v in edges]
@@ -1,11 +1,48 @@
 from math import inf
+from operator import eq
 from heapq import heappush, heappop
+import io
+import bz2
+import gzip
 import random
+from itertools import chain, count, islice
+from threading import Lock, get_ident
+from weakref import WeakMethod
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from collections import defaultdict
 from .vertices import Vertices
 from .edges import Edges
+from .csr import CSRGraph
+from .union_find import UnionFind
+from .shortest_paths import ShortestPaths
+from .cache import LRUCache, cached
+from .instrument import Instrumentation, LoggingSink, spanned
+from .locks import RWLock, reading, writing
+from .cliques import iter_cliques
+from .cores import csr_core_decomposition
+from .generators import gnp_edges, gnm_edges, barabasi_albert_edges, rmat_edges, random_regular_edges
+from .binary import save_binary, open_binary
+from . import sparse
+
+_worker_graph = None
+
+def _as_list(values):
+  # NumPy and array.array items become plain Python numbers
+  return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+def _init_worker(graph):
+  global _worker_graph
+  _worker_graph = graph
+
+def _centrality_worker(sources, metrics, squares):
+  return _worker_graph._centrality_source()._centrality_sums(sources, metrics, squares)
+
+CENTRALITY_METRICS = ('vertex_betweenness', 'edge_betweenness', 'closeness', 'harmonic')
+_BATCH_BITS = 1 << 26 # bits of reach per bit-parallel BFS batch, see _eccentricities
 
 class Graph:
+  _lazy = None # (CSRGraph, Lock) of a graph opened with open_binary until V and E are built
   
   def __init__(self, graph=None, undirected=True, default_v_weight=1.0, default_e_weight=1.0, default_v_absent_weight=inf, default_e_absent_weight=inf, verbose=False):
     '''
@@ -13,16 +50,27 @@ class Graph:
       
       edges: a set of edges, default is None, which means empty graph
       undirected: if the graph is undirected/directed, default it is a undirected graph
+      verbose: keep the attributes of re-added vertices and edges, and log
+      diagnostics through an instrumentation with a LoggingSink
     '''
     self.has_self_link = False
     self.verbose = verbose
+    self.instrumentation = Instrumentation(LoggingSink()) if verbose else None
     self.default_v_weight = default_v_weight
     self.default_e_weight = default_e_weight
     self.default_v_absent_weight = default_v_absent_weight
     self.default_e_absent_weight = default_e_absent_weight
     self.undirected = undirected
+    self._csr = None
+    self._engines = {} # shortest-path buffers over the current snapshot, see _shortest_paths
+    self.version = 0 # bumped by every mutation
+    self._cache = None # optional query cache, see enable_cache
+    self._connectivity = None # optional union-find index, see enable_connectivity_index
+    self._connectivity_dirty = False
+    self._lock = None # readers-writer lock, see enable_concurrency
     self.V = Vertices(verbose=verbose)
     self.E = Edges(undirected, verbose=verbose)
+    self._hook()
     if graph:
       if type(graph) is str:
         self.parse_txt(graph)
@@ -37,6 +85,7 @@ class Graph:
         if not parsed:
           self.parse_edges(graph)
       
+  @writing
   def parse_vertices(self, vertices):
     for u in vertices:
       if type(u) is list:
@@ -44,6 +93,7 @@ class Graph:
       else:
         self.add_vertex(u)
       
+  @writing
   def parse_edges(self, edges):
     if edges is None:
         return
@@ -64,23 +114,253 @@ class Graph:
     else:
       raise ValueError('Edge format is not correct.')
     
+  @writing
   def clear(self):
     self.V.clear()
     self.E.clear()
+    self._touch()
+    if self._connectivity is not None:
+      self._connectivity = UnionFind()
+      self._connectivity_dirty = False
+
+  def __getattr__(self, name):
+    # the stores of a graph opened with open_binary are built on first use
+    if name in ('V', 'E') and self.__dict__.get('_lazy') is not None:
+      self._load()
+      return self.__dict__[name]
+    raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+  def _load(self):
+    csr, lock = self._lazy
+    with lock:
+      if self._lazy is None: # built by another thread meanwhile
+        return
+      V = Vertices(verbose=self.verbose)
+      E = Edges(self.undirected, verbose=self.verbose)
+      csr.fill(V, E)
+      self.E = E
+      self.V = V
+      self._hook()
+      self._lazy = None
+
+  def __getstate__(self):
+    if self._lazy is not None:
+      self._load()
+    state = self.__dict__.copy()
+    state['instrumentation'] = None # sinks such as callbacks need not be picklable
+    state['_engines'] = {}
+    if self._csr is not None and self._csr._buffer is not None:
+      state['_csr'] = None # views of a file buffer do not pickle
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._hook()
+
+  def _hook(self):
+    # route writes through vertex and edge proxies to _write_through; weakly,
+    # so a graph (or a snapshot) is freed as soon as it is dropped
+    self.V.on_write = self.E.on_write = WeakMethod(self._write_through)
+
+  @writing
+  def _write_through(self, write, *args):
+    '''
+      apply a write made through a vertex or edge proxy, e.g.
+      G.edge(u, v).weight = w, as a mutation of the graph
+    '''
+    write(*args)
+    self._touch()
+
+  def _touch(self):
+    '''
+      called by every mutation, drops derived state such as the frozen snapshot
+    '''
+    self.version += 1
+    self._csr = None
+
+  @reading
+  def freeze(self):
+    '''
+      build (or reuse) an immutable CSR snapshot of the graph
+
+      while the snapshot is current, analytics such as connected_components,
+      edge_betweenness and max_cliques run on it; any mutation discards it
+    '''
+    if self._csr is None:
+      self._engines = {}
+      if self.instrumentation is None:
+        self._csr = CSRGraph.from_graph(self)
+      else:
+        with self.instrumentation.span('freeze'):
+          self._csr = CSRGraph.from_graph(self)
+    return self._csr
+
+  @property
+  def frozen(self):
+    return self._csr is not None
+
+  @writing
+  def snapshot(self):
+    '''
+      a read-only, consistent copy of the graph in O(1), e.g. to run long
+      analytics while this graph keeps changing
+
+      the snapshot shares the adjacency and attribute storage; this graph
+      copies what it modifies afterwards (copy-on-write): the vertex and
+      adjacency indexes and the weight columns once, the neighbor maps one
+      vertex at a time. dropping the last reference to the snapshot frees
+      its memory and stops the copying; mutating it raises TypeError
+    '''
+    G = Graph.__new__(Graph)
+    G.__dict__.update(self.__dict__)
+    G.V = self.V.share()
+    G.E = self.E.share()
+    G._hook()
+    G._engines = {}
+    G._cache = None if self._cache is None else LRUCache(self._cache.maxsize)
+    G._connectivity = None
+    G._connectivity_dirty = False
+    G._lock = None if self._lock is None else RWLock()
+    return G
+
+  def enable_cache(self, maxsize=128):
+    '''
+      cache the results of analytic queries (connected_components,
+      degrees, max_cliques, path and distance queries, ...) until the next
+      mutation, keeping at most maxsize results; a hit returns a copy, so
+      modifying a result does not affect later calls
+    '''
+    self._cache = LRUCache(maxsize)
+
+  def disable_cache(self):
+    self._cache = None
+
+  def enable_instrumentation(self, *sinks):
+    '''
+      count operations (edges added, relaxations, heap pushes, ...), record
+      BFS frontier sizes and time algorithms; events and spans go to the
+      sinks (LoggingSink, CallbackSink, Recorder or any object with event
+      and span methods)
+
+      returns the Instrumentation, see its counters and summary()
+    '''
+    self.instrumentation = Instrumentation(*sinks)
+    return self.instrumentation
+
+  def disable_instrumentation(self):
+    self.instrumentation = None
+
+  def enable_concurrency(self):
+    '''
+      make the graph safe to share between threads: queries take a shared
+      read lock and mutations an exclusive write lock, so readers never see
+      a half-applied update; neighbors() then returns a copy and the lazy
+      iterators raise RuntimeError if the graph changes while in use
+
+      this buys consistency, not parallel speedup: pure Python analytics
+      still take turns on the GIL; instrumentation counters are not locked
+    '''
+    if self._lock is None:
+      self._lock = RWLock()
+
+  def disable_concurrency(self):
+    self._lock = None
+
+  @property
+  def concurrent(self):
+    return self._lock is not None
+
+  @contextmanager
+  def transaction(self):
+    '''
+      group mutations under a single write lock:
+
+        with G.transaction():
+          G.remove_edge(u, v)
+          G.add_edge(u, w)
+
+      readers see either none or all of them, and the lock is taken once
+      instead of per call; an exception leaves the changes made so far in
+      place (there is no rollback); a no-op without enable_concurrency
+    '''
+    if self._lock is None:
+      yield self
+      return
+    with self._lock.write():
+      yield self
+
+  def _guarded(self, iterator):
+    '''
+      in concurrent mode, advance iterator under the read lock and stop with
+      RuntimeError once a writer has changed the graph
+    '''
+    lock, version = self._lock, self.version
+    if lock is None:
+      return iterator
+
+    def guarded():
+      while True:
+        with lock.read():
+          if self.version != version:
+            raise RuntimeError('The graph changed during iteration.')
+          try:
+            item = next(iterator)
+          except StopIteration:
+            return
+        yield item
+    return guarded()
+
+  def cache_info(self):
+    '''
+      hit, miss, eviction and invalidation counts of the query cache, None
+      if it is disabled
+    '''
+    return None if self._cache is None else self._cache.info()
+
+  @reading
+  def save_binary(self, path):
+    '''
+      save the graph in the binary format read by open_binary
+    '''
+    save_binary(self.freeze(), path)
+
+  @staticmethod
+  def open_binary(path, mmap=True):
+    '''
+      open a binary graph file (memory-mapped by default) as a Graph frozen
+      on the file's CSR snapshot: analytics that run on the snapshot start
+      at once, the vertex and edge stores are built from it in bulk the first
+      time a query or a mutation needs them
+    '''
+    csr = open_binary(path, mmap=mmap)
+    G = Graph(undirected=csr.undirected, default_e_weight=csr.default_weight)
+    del G.V, G.E
+    G._lazy = (csr, Lock())
+    G._csr = csr
+    G.has_self_link = any(map(eq, csr.sources, csr.destinations))
+    return G
      
   @property
+  @reading
   def vertices(self):
+    if self._csr is not None:
+      return list(self._csr.labels)
     return list(self.V._vertices.keys())
   
   @property
+  @reading
   def detailed_vertices(self):
-    return [(v, self.V[v].to_dict()) for v in self.V._vertices]
+    store = self.V._store
+    return [(v, store.to_dict(slot)) for v, slot in self.V._vertices.items()]
   
   @property
+  @reading
   def detailed_edges(self):
-    return [(u, v, self.E[u, v].to_dict()) for (u, v) in self.edges]
+    store = self.E._store
+    return [(u, v, store.to_dict(slot)) for u, nbrs in self.E._neighbors.items() for v, slot in nbrs.items()]
     
   @property
+  @reading
   def edges(self):
     return self.E.items
   
@@ -88,12 +368,28 @@ class Graph:
     '''
         load the graph from txt
     '''
+    self.parse_lines(io.StringIO(txt))
+
+  @writing
+  @spanned
+  def parse_lines(self, lines, progress=None, progress_every=100000):
+    '''
+        load the graph from an iterable of text lines, one line at a time
+
+        progress: called as progress(lines_read) every progress_every lines
+        and once at the end
+    '''
     self.clear()
     mode = 'edge'
     options = []
-    edge_list = []
-    lines = [line.strip() for line in txt.split('\n') if line.strip()]
+    lines_read = 0
     for line in lines:
+      lines_read += 1
+      if progress is not None and lines_read % progress_every == 0:
+        progress(lines_read)
+      line = line.strip()
+      if not line:
+        continue
       p = line.find('#')
       if p != -1:
         command_line = line[p+1:].strip()
@@ -113,198 +409,638 @@ class Graph:
         self.add_vertex(x[0], **{key: value for key, value in zip(options, x[1:])})
       elif mode == 'edge':
         self.add_edge(x[0], x[1], **{key: value for key, value in zip(options, x[2:])})
+    if progress is not None:
+      progress(lines_read)
     
-  def load(self, file_name):
+  def load(self, file_name, progress=None, progress_every=100000, encoding=None):
     '''
-        load the graph from file <file_name>
+        load the graph from file <file_name>, streaming it line by line;
+        gzip and bz2 compressed files are detected from their header
     '''
-    with open(file_name) as f:
-      txt = f.read()
-      self.parse_txt(txt)
+    with open(file_name, 'rb') as raw:
+      magic = raw.read(3)
+    if magic[:2] == b'\x1f\x8b':
+      f = gzip.open(file_name, 'rt', encoding=encoding)
+    elif magic == b'BZh':
+      f = bz2.open(file_name, 'rt', encoding=encoding)
+    else:
+      f = open(file_name, encoding=encoding)
+    with f:
+      self.parse_lines(f, progress=progress, progress_every=progress_every)
             
-  def add_edges(self, edge_list):
+  @writing
+  def add_edges(self, edge_list, allow_add_vertex=True):
+    '''
+      add (u, v) or (u, v, attributes) items as one batch
+    '''
+    if self.verbose:
+      for edge in edge_list:
+        self.add_edge(edge[0], edge[1], allow_add_vertex, **(edge[2] if len(edge) > 2 else {}))
+      return
+    sources = []
+    targets = []
+    attributes = []
     for edge in edge_list:
-      u = edge[0]
-      v = edge[1]
-      e = {}
-      if len(edge) > 2:
-        e = edge[2]
-        
-      self.add_edge(u, v, **e)
+      sources.append(edge[0])
+      targets.append(edge[1])
+      attributes.append(edge[2] if len(edge) > 2 else None)
+    self.add_edges_from_arrays(sources, targets, attributes=attributes, allow_add_vertex=allow_add_vertex)
+
+  @writing
+  @spanned
+  def add_edges_from_arrays(self, sources, targets, weights=None, attributes=None, allow_add_vertex=True):
+    '''
+      bulk insert the edges (sources[i], targets[i]) given as parallel
+      sequences (lists, array.array or NumPy arrays), with optional parallel
+      weights and attribute dicts
+
+      missing vertices are created in one step (or the edges touching them
+      skipped when allow_add_vertex is False) and the adjacency is filled
+      in a single pass
+    '''
+    sources, targets = _as_list(sources), _as_list(targets)
+    if weights is not None:
+      weights = _as_list(weights)
+    if len(sources) != len(targets) or (weights is not None and len(weights) != len(sources)):
+      raise ValueError('sources, targets and weights must have the same length.')
+    vertices = self.V._vertices
+    missing = {x: None for x in dict.fromkeys(chain.from_iterable(zip(sources, targets))) if x not in vertices}
+    if missing:
+      if allow_add_vertex:
+        self.V.add_many(missing)
+      else:
+        keep = [i for i, (u, v) in enumerate(zip(sources, targets)) if u not in missing and v not in missing]
+        sources = [sources[i] for i in keep]
+        targets = [targets[i] for i in keep]
+        if weights is not None:
+          weights = [weights[i] for i in keep]
+        if attributes is not None:
+          attributes = [attributes[i] for i in keep]
+    self_loops, edges = self.E.self_loops, len(self.E)
+    self.E.add_many(sources, targets, weights, attributes)
+    if self.E.self_loops > self_loops:
+      self.has_self_link = True
+    self._touch()
+    if self.instrumentation is not None:
+      self.instrumentation.count('edges_added', len(self.E) - edges)
+      if allow_add_vertex:
+        self.instrumentation.count('vertices_added', len(missing))
+    if self._connectivity is not None:
+      index = self._connectivity
+      if allow_add_vertex:
+        for x in missing:
+          index.add(x)
+      for u, v in zip(sources, targets):
+        index.union(u, v)
             
+  @writing
   def remove_edges(self, edge_list):
     for edge in edge_list:
       u = edge[0]
       v = edge[1]
       self.remove_edge(u, v)
   
+  @reading
   def vertex(self, v):
-    return self.V[v]
+    vertex = self.V[v]
+    if vertex is None and self.instrumentation is not None:
+      self.instrumentation.event('vertex_not_found', vertex=v)
+    return vertex
   
+  @writing
   def add_vertex(self, v, **kwargs):
-    if self.verbose:
-      print('add vertex', v)
+    instrumentation = self.instrumentation
+    if instrumentation is not None:
+      if v in self.V:
+        instrumentation.event('vertex_exists', vertex=v)
+      else:
+        instrumentation.count('vertices_added')
     self.V.add(v, **kwargs)
+    self._touch()
+    if self._connectivity is not None:
+      self._connectivity.add(v)
   
+  @writing
   def remove_vertex(self, v):
     vertex = self.V.remove(v)
-    if vertex is None:
-      if self.verbose:
-        print('Vertex', v, 'can not be found, abort.')
+    edges = len(self.E)
     self.E.remove_vertex(v)
+    self._touch()
+    if self.instrumentation is not None:
+      if vertex is None:
+        self.instrumentation.event('vertex_not_found', vertex=v)
+      else:
+        self.instrumentation.count('vertices_removed')
+      self.instrumentation.count('edges_removed', edges - len(self.E))
+    self._connectivity_dirty = True
     
   def has_vertex(self, v):
-    vertex = self.vertex(v)
-    return True if vertex else False
+    if self._csr is not None:
+      return v in self._csr.index
+    return v in self.V
   
   def neighbors(self, v):
-    return [n for n in self.E.neighbors(v)]
+    '''
+      a read-only view of the neighbors of v, use list() for a copy; in
+      concurrent mode a list copy taken under the read lock
+    '''
+    lock = self._lock
+    if lock is None:
+      return self.E.neighbors(v)
+    with lock.read():
+      return list(self.E.neighbors(v))
   
   def reverse_neighbors(self, v):
-    return [n for n in self.E.reverse_neighbors(v)]
+    lock = self._lock
+    if lock is None:
+      return self.E.reverse_neighbors(v)
+    with lock.read():
+      return list(self.E.reverse_neighbors(v))
+
+  def iter_vertices(self):
+    return self._guarded(iter(self.V._vertices))
+
+  def iter_edges(self, data=False):
+    '''
+      lazily yield (u, v) for every edge, or (u, v, attributes) with data
+    '''
+    return self._guarded(self._iter_edges(data))
+
+  def _iter_edges(self, data):
+    if not data:
+      yield from self.E
+      return
+    store = self.E._store
+    for u, nbrs in self.E._neighbors.items():
+      for v, slot in nbrs.items():
+        yield (u, v, store.to_dict(slot))
   
+  @reading
   def edge(self, u, v):
     return self.E[u, v]
   
+  @reading
   def has_edge(self, u, v):
     return True if self.edge(u, v) else False
     
+  @writing
   def add_edge(self, u, v, allow_add_vertex=True, **kwargs):
     if u == v:
       self.has_self_link = True
-    if self.verbose:
-      print(f'add edge ({u}, {v})')
-    if not self.has_vertex(u):
-      if allow_add_vertex:
-        self.add_vertex(u)
-      else:
-        if self.verbose:
-          print(f'Failed to find vertex {u}, abort.')
-        return
-    if not self.has_vertex(v):
-      if allow_add_vertex:
-        self.add_vertex(v)
-      else:
-        if self.verbose:
-          print(f'Failed to find vertex {v}, abort.')
-        return
+    instrumentation = self.instrumentation
+    for x in (u, v):
+      if not self.has_vertex(x):
+        if allow_add_vertex:
+          self.add_vertex(x)
+        else:
+          if instrumentation is not None:
+            instrumentation.event('vertex_not_found', vertex=x, edge=(u, v))
+          return
+    if instrumentation is not None:
+      edges = len(self.E)
     self.E.add(u, v, **kwargs)
+    self._touch()
+    if instrumentation is not None:
+      if len(self.E) > edges:
+        instrumentation.count('edges_added')
+      else:
+        instrumentation.event('edge_exists', edge=(u, v))
+    if self._connectivity is not None:
+      self._connectivity.union(u, v)
             
+  @writing
   def remove_edge(self, u, v):
-    if self.verbose:
-      print('remove edge', u, v)
+    edges = len(self.E)
     self.E.remove(u, v)
+    self._touch()
+    if self.instrumentation is not None:
+      self.instrumentation.count('edges_removed', edges - len(self.E))
+    self._connectivity_dirty = True
     
+  def number_of_vertices(self):
+    if self._csr is not None:
+      return len(self._csr)
+    return len(self.V)
+
+  def number_of_edges(self):
+    if self._csr is not None:
+      return self._csr.number_of_edges
+    return len(self.E)
+
+  def number_of_self_loops(self):
+    return self.E.self_loops
+
   def degree(self, v):
-    neighbors = self.neighbors(v)
-    return len(neighbors) + neighbors.count(v)
+    return self.E.degree(v)
+
+  def in_degree(self, v):
+    return self.E.degree(v) if self.undirected else self.E.in_degree(v)
+
+  def out_degree(self, v):
+    return self.E.degree(v) if self.undirected else self.E.out_degree(v)
     
+  @reading
+  @cached
   def degrees(self):
-    return sorted([self.degree(u) for u in self.vertices], reverse=True)
+    return sorted([self.E.degree(u) for u in self.V._vertices], reverse=True)
     
+  @reading
   def min_degree(self):
-    return min([self.degree(u) for u in self.vertices])
+    return min([self.E.degree(u) for u in self.V._vertices])
     
+  @reading
   def max_degree(self):
-    return max([self.degree(u) for u in self.vertices])
+    return max([self.E.degree(u) for u in self.V._vertices])
+
+  @reading
+  @cached
+  @spanned
+  def core_numbers(self, mode='all'):
+    '''
+      the core number of every vertex: the largest k such that the vertex
+      belongs to a k-core, a maximal subgraph where every vertex has degree
+      at least k; self-loops are ignored
+
+      mode: on directed graphs, the degree used, 'in', 'out' or 'all'
+    '''
+    csr = self.freeze()
+    core, _ = csr_core_decomposition(csr, mode)
+    return dict(zip(csr.labels, core))
+
+  @reading
+  @cached
+  def degeneracy_ordering(self, mode='all'):
+    '''
+      the vertices in an order where each one has minimum degree among the
+      vertices not yet listed, see core_numbers
+    '''
+    csr = self.freeze()
+    _, order = csr_core_decomposition(csr, mode)
+    return [csr.labels[v] for v in order]
+
+  @reading
+  def k_core(self, k=None, mode='all'):
+    '''
+      the subgraph induced by the vertices of core number at least k, by
+      default the innermost (largest k) core
+    '''
+    core = self.core_numbers(mode)
+    if k is None:
+      k = max(core.values(), default=0)
+    return self.subgraph([v for v, c in core.items() if c >= k])
+
+  @reading
+  def subgraph(self, vertices):
+    '''
+      a new graph with the given vertices, the edges between them and their
+      attributes
+    '''
+    vertices = [v for v in dict.fromkeys(vertices) if v in self.V]
+    keep = set(vertices)
+    G = Graph(undirected=self.undirected, default_v_weight=self.default_v_weight,
+      default_e_weight=self.default_e_weight, default_v_absent_weight=self.default_v_absent_weight,
+      default_e_absent_weight=self.default_e_absent_weight)
+    V = self.V
+    for v in vertices:
+      G.add_vertex(v, **V._store.to_dict(V._vertices[v]))
+    sources, targets, attributes = [], [], []
+    store = self.E._store
+    for u, v in self.E:
+      if u in keep and v in keep:
+        sources.append(u)
+        targets.append(v)
+        attributes.append(store.to_dict(self.E.slot(u, v)))
+    G.add_edges_from_arrays(sources, targets, attributes=attributes, allow_add_vertex=False)
+    return G
+
+  @reading
+  @cached
+  def degree_histogram(self):
+    '''
+      a list whose i-th item is the number of vertices of degree i
+    '''
+    histogram = []
+    for u in self.V._vertices:
+      d = self.E.degree(u)
+      if d >= len(histogram):
+        histogram.extend([0] * (d + 1 - len(histogram)))
+      histogram[d] += 1
+    return histogram
     
+  @reading
   def density(self):
-    V = len(self.vertices)
-    E = len(self.edges)
+    V = len(self.V)
+    E = len(self.E)
     if self.undirected:
       E *= 2
     return E / V ** 2 if self.has_self_link else E / (V * (V-1))
         
+  @reading
+  @spanned
   def is_connected(self, vis=None, start=None):
+    '''
+      True if every vertex can be reached from start (the first vertex by
+      default) following neighbors; vis may pass a set of visited vertices
+    '''
+    if not self.number_of_vertices():
+      return True
+    if start is None and vis is None and self.undirected and self._connectivity is not None:
+      return self.number_of_components() == 1
+    if start is None and vis is None and self._csr is not None:
+      engine = self._shortest_paths(None)
+      engine.run([0])
+      return len(engine.touched) == len(self._csr)
     if vis is None:
       vis = set()
-    if not start:
-      start = self.vertices[0]
+    if start is None:
+      start = next(iter(self.V._vertices))
     vis.add(start)
-    if len(vis) == len(self.vertices):
-      return True
-    else:
-      for v in self.E.neighbors(start):
-        if v not in vis and self.is_connected(vis, v):
-          return True
+    stack = [start]
+    while stack:
+      for v in self.E.neighbors(stack.pop()):
+        if v not in vis:
+          vis.add(v)
+          stack.append(v)
+    return len(vis) == len(self.V)
+
+  '''
+  -------------------connectivity index-------------------------
+  '''
+
+  @writing
+  def enable_connectivity_index(self):
+    '''
+      maintain a union-find index of the (weakly) connected components:
+      add_vertex and add_edge update it in O(α(n)), removals mark it dirty
+      and the next query rebuilds it
+    '''
+    if self._connectivity is None:
+      self._connectivity = self._build_connectivity()
+      self._connectivity_dirty = False
+
+  @writing
+  def disable_connectivity_index(self):
+    self._connectivity = None
+    self._connectivity_dirty = False
+
+  def _build_connectivity(self):
+    index = UnionFind(self.V._vertices)
+    for u, v in self.E:
+      index.union(u, v)
+    return index
+
+  def _connectivity_index(self):
+    if self._connectivity is None:
+      return self._build_connectivity()
+    if self._connectivity_dirty:
+      self._connectivity = self._build_connectivity()
+      self._connectivity_dirty = False
+    return self._connectivity
+
+  @reading
+  def same_component(self, u, v):
+    '''
+      True if u and v are in the same weakly connected component
+    '''
+    if u not in self.V or v not in self.V:
       return False
+    index = self._connectivity_index()
+    return index.find(u) == index.find(v)
+
+  @reading
+  def number_of_components(self):
+    return self._connectivity_index().count
+
+  @reading
+  def component_sizes(self):
+    '''
+      the sizes of the weakly connected components, largest first
+    '''
+    index = self._connectivity_index()
+    return sorted((index.size[x] for x in index.parent if index.parent[x] == x), reverse=True)
+
+  @reading
+  def component_of(self, v):
+    '''
+      a representative vertex of the component of v, None if v does not exist
+    '''
+    return self._connectivity_index().find(v) if v in self.V else None
     
   '''
   -------------------weight-------------------------
   '''
 
+  @reading
   def edge_weight(self, u, v):
-    e = self.E[u, v]
-    if e:
-      return e.weight if hasattr(e, 'weight') else self.default_e_weight
-    else:
-      return self.default_e_absent_weight
+    return self.E.weight(u, v, self.default_e_weight, self.default_e_absent_weight)
 
+  @reading
   def vertex_weight(self, v):
-    x = self.vertex(v)
-    if x:
-      return x.weight if hasattr(x, 'weight') else self.default_v_weight
-    else:
-      return self.default_v_absent_weight
+    return self.V.weight(v, self.default_v_weight, self.default_v_absent_weight)
 
+  @writing
   def add_edge_weight(self, u, v, w):
-    e = self.E[u, v]
-    if e:
-      if not hasattr(e, 'weight'):
-        e.weight = self.default_e_weight
-      e.weight += w
+    if self.E.slot(u, v) is not None:
+      self.E.set_weight(u, v, self.edge_weight(u, v) + w)
+      self._touch()
 
+  @writing
   def add_vertex_weight(self, v, w):
-    x = self.vertex(v)
-    if x:
-      if not hasattr(x, 'weight'):
-        x.weight = self.default_v_weight
-      x.weight += w
+    slot = self.V._vertices.get(v)
+    if slot is not None:
+      self.V._store.set(slot, 'weight', self.vertex_weight(v) + w)
+      self._touch()
 
+  @reading
   def total_edge_weight(self, v=None, mode='in'):
     '''
-      mode: in/out/all
+      weighted degree of v, or its sum over all vertices if v is None
+
+      mode: in/out/all; on undirected graphs 'in' and 'out' both give the
+      weight of the incident edges (self-loops once) and 'all' twice that
+
+      O(1): the strengths are maintained as edges and weights change
     '''
     if v is None:
-        return sum([self.total_edge_weight(v, mode) for v in self.vertices])
+      return self.E.total_strength(mode, self.default_e_weight)
     if not self.has_vertex(v):
       return .0
-    weight = .0
-    if mode != 'out':
-      weight += sum([self.edge_weight(n, v) for n in self.E.reverse_neighbors(v)])
-    if mode != 'in':
-      weight += sum([self.edge_weight(v, n) for n in self.E.neighbors(v)])
-    return weight
-      
+    return self.E.strength(v, mode, self.default_e_weight)
 
+  @reading
   def total_vertex_weight(self):
-    return sum([self.vertex_weight(v) for v in self.vertices])
+    V = self.V
+    unweighted = len(V) - V._store.weighted
+    weight = V._store.weight_total
+    if unweighted:
+      weight += unweighted * self.default_v_weight
+    return weight
   
   '''
   -------------------betweenness-------------------------
   '''
   
-  def edge_betweenness(self, normalized=True):
-    betweenness = dict.fromkeys(self.vertices, 0.0)
-    betweenness.update(dict.fromkeys(self.edges, 0.0))
-    
-    for v in self.vertices:
-      V, P, sigma, _ = self._betweenness_dijkstra(v)
-      betweenness = self._accumulate_edges(betweenness, V, P, sigma, v)
-        
-    for v in self.vertices:
-      del betweenness[v]
-    
-    betweeness = self._rescale_e(betweenness, normalized=normalized)
-    return betweenness
+  @reading
+  @cached
+  def edge_betweenness(self, normalized=True, k=None, seed=None, workers=None, return_error=False):
+    '''
+      k: estimate from k randomly sampled sources (Brandes-Pich), seeded by seed
+      workers: split the sources over a pool of worker processes
+      return_error: also return the standard error of each sampled estimate
+    '''
+    result = self.centrality(('edge_betweenness',), normalized, k, seed, workers, return_error)
+    if return_error:
+      return result[0]['edge_betweenness'], result[1]['edge_betweenness']
+    return result['edge_betweenness']
+
+  @reading
+  @cached
+  def vertex_betweenness(self, normalized=True, k=None, seed=None, workers=None, return_error=False):
+    result = self.centrality(('vertex_betweenness',), normalized, k, seed, workers, return_error)
+    if return_error:
+      return result[0]['vertex_betweenness'], result[1]['vertex_betweenness']
+    return result['vertex_betweenness']
+
+  @reading
+  def betweenness(self, kind='both', normalized=True, k=None, seed=None, workers=None):
+    '''
+      kind: 'vertex', 'edge' or 'both', the latter returns
+      (vertex_betweenness, edge_betweenness) computed in one sweep
+    '''
+    if kind not in ('vertex', 'edge', 'both'):
+      raise ValueError(f'Unknown betweenness kind {kind}.')
+    metrics = ('vertex_betweenness', 'edge_betweenness') if kind == 'both' else (f'{kind}_betweenness',)
+    result = self.centrality(metrics, normalized, k, seed, workers)
+    if kind == 'both':
+      return result['vertex_betweenness'], result['edge_betweenness']
+    return result[metrics[0]]
+
+  @reading
+  @cached
+  def closeness_centrality(self, workers=None):
+    return self.centrality(('closeness',), workers=workers)['closeness']
+
+  @reading
+  @cached
+  def harmonic_centrality(self, workers=None):
+    return self.centrality(('harmonic',), workers=workers)['harmonic']
+
+  @reading
+  @spanned
+  def centrality(self, metrics=CENTRALITY_METRICS, normalized=True, k=None, seed=None, workers=None, return_error=False):
+    '''
+      several centrality metrics from a single shortest-path sweep
+
+      metrics: any of 'vertex_betweenness', 'edge_betweenness', 'closeness'
+      and 'harmonic'; closeness and harmonic centrality use the distances
+      from each vertex (out-distances on directed graphs)
+      k, seed: sample k sources for the betweenness metrics (Brandes-Pich)
+      workers: split the sources over a pool of worker processes
+      return_error: also return the standard errors of sampled estimates
+
+      returns a dict from metric name to a dict of values
+    '''
+    for metric in metrics:
+      if metric not in CENTRALITY_METRICS:
+        raise ValueError(f'Unknown centrality metric {metric}.')
+    sources = self.vertices
+    n = len(sources)
+    sampled = k is not None and k < n
+    if sampled:
+      if k < 1:
+        raise ValueError('k must be a positive number of sources.')
+      if 'closeness' in metrics or 'harmonic' in metrics:
+        raise ValueError('Closeness and harmonic centrality can not be sampled.')
+      sources = random.Random(seed).sample(sources, k)
+
+    if workers and workers > 1 and len(sources) > 1:
+      chunks = [sources[i::workers] for i in range(workers) if sources[i::workers]]
+      with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker, initargs=(self,)) as executor:
+        partials = list(executor.map(_centrality_worker, chunks, [metrics] * len(chunks), [sampled] * len(chunks)))
+      sums, squares = partials[0]
+      for partial, partial_squares in partials[1:]:
+        for metric in metrics:
+          total = sums[metric]
+          for key, value in partial[metric].items():
+            total[key] += value
+          if sampled:
+            total = squares[metric]
+            for key, value in partial_squares[metric].items():
+              total[key] += value
+    elif self._csr is not None:
+      sums, squares = self._csr._centrality_sums(sources, metrics, sampled, self.instrumentation)
+    else:
+      sums, squares = self._centrality_sums(sources, metrics, sampled)
+
+    errors = {}
+    for metric in metrics:
+      values = sums[metric]
+      error = dict.fromkeys(values, 0.0)
+      if metric in ('closeness', 'harmonic'):
+        errors[metric] = error
+        continue
+      if sampled:
+        # the estimate is n times the mean contribution of a sampled source;
+        # its standard error uses the finite population correction
+        for key, total in values.items():
+          variance = max(squares[metric][key] - total * total / k, 0.0) / (k - 1) if k > 1 else 0.0
+          error[key] = n * (variance / k * (n - k) / (n - 1)) ** 0.5
+          values[key] = total * n / k
+      rescale = self._rescale_e if metric == 'edge_betweenness' else self._rescale_v
+      sums[metric] = rescale(values, normalized=normalized)
+      errors[metric] = rescale(error, normalized=normalized)
+    return (sums, errors) if return_error else sums
+
+  def _centrality_source(self):
+    return self._csr if self._csr is not None else self
+
+  def _centrality_sums(self, sources, metrics, squares=False):
+    '''
+      summed contributions of the given sources to each metric, and the sums
+      of their squares for the betweenness metrics if squares is set
+    '''
+    n = len(self.V._vertices)
+    betweenness = dict.fromkeys(self.V._vertices, 0.0)
+    betweenness.update(dict.fromkeys(self.E, 0.0))
+    sums = dict.fromkeys(betweenness, 0.0) if squares else None
+    closeness = {}
+    harmonic = {}
+    for v in sources:
+      V, P, sigma, D = self._betweenness_dijkstra(v)
+      if 'closeness' in metrics or 'harmonic' in metrics:
+        total = sum(D.values())
+        r = len(D) - 1
+        closeness[v] = r / total * r / (n - 1) if total > 0 else 0.0
+        harmonic[v] = sum(1 / d for d in D.values() if d > 0)
+      if squares:
+        local = dict.fromkeys(betweenness, 0.0)
+        self._accumulate_edges(local, V, P, sigma, v)
+        for key, c in local.items():
+          if c:
+            betweenness[key] += c
+            sums[key] += c * c
+      else:
+        betweenness = self._accumulate_edges(betweenness, V, P, sigma, v)
+
+    result = {'closeness': closeness, 'harmonic': harmonic}
+    result['vertex_betweenness'] = {v: betweenness.pop(v) for v in self.V._vertices}
+    result['edge_betweenness'] = betweenness
+    if squares:
+      squares = {'vertex_betweenness': {v: sums.pop(v) for v in self.V._vertices}, 'edge_betweenness': sums}
+    return {metric: result[metric] for metric in metrics}, squares
   
   def _betweenness_dijkstra(self, s):
+    if self._unit_weights:
+      return self._betweenness_bfs(s)
+    E = self.E
+    pushes = 1
+    default, absent = self.default_e_weight, self.default_e_absent_weight
     V = [] # vertices that can be reached
     P = {} # dictionary of predecessors
-    for v in self.vertices:
+    for v in self.V._vertices:
       P[v] = []
         
-    sigma = dict.fromkeys(self.vertices, 0.0)
+    sigma = dict.fromkeys(self.V._vertices, 0.0)
     
     D = {} # dictionary of final distances
     
@@ -320,21 +1056,62 @@ class Graph:
       V.append(v)
       D[v] = dist
 
-      for w in self.neighbors(v):
-        vw_dist = dist + self.edge_weight(v, w)
+      for w in self.E.neighbors(v):
+        vw_dist = dist + E.weight(v, w, default, absent)
         if w in D:
           if vw_dist < D[w]:
-            print('Error: found better path in final vertex in Dijkstra')
+            raise ValueError('Dijkstra found a shorter path to a settled vertex, negative edge weights are not supported.')
         elif w not in seen or vw_dist < seen[w]:
           seen[w] = vw_dist
           heappush(Q, (vw_dist, v, w))
+          pushes += 1
           sigma[w] = 0.0
           P[w] = [v]
         elif vw_dist == seen[w]:
           sigma[w] += sigma[v]
           P[w].append(v)
+    instrumentation = self.instrumentation
+    if instrumentation is not None:
+      instrumentation.count('dijkstra_settled', len(V))
+      instrumentation.count('heap_pushes', pushes)
+      instrumentation.count('relaxations', sum(len(E.neighbors(v)) for v in V))
     return V, P, sigma, D
   
+  def _betweenness_bfs(self, s):
+    '''
+      level-synchronous BFS version of _betweenness_dijkstra for unit weights
+    '''
+    V = [s] # vertices that can be reached, in order of distance
+    P = {v: [] for v in self.V._vertices} # dictionary of predecessors
+    sigma = dict.fromkeys(self.V._vertices, 0.0)
+    sigma[s] = 1.0
+    D = {s: 0}
+    frontier = [s]
+    d = 0
+    instrumentation = self.instrumentation
+    while frontier:
+      if instrumentation is not None:
+        instrumentation.observe('bfs_frontier', len(frontier))
+      d += 1
+      next_frontier = []
+      for v in frontier:
+        sigma_v = sigma[v]
+        for w in self.E.neighbors(v):
+          if w not in D:
+            D[w] = d
+            next_frontier.append(w)
+          if D[w] == d:
+            sigma[w] += sigma_v
+            P[w].append(v)
+      V.extend(next_frontier)
+      frontier = next_frontier
+    if instrumentation is not None:
+      instrumentation.count('bfs_visited', len(V))
+      instrumentation.count('relaxations', sum(len(self.E.neighbors(v)) for v in V))
+    if self.default_e_weight != 1:
+      D = {v: d * self.default_e_weight for v, d in D.items()}
+    return V, P, sigma, D
+
   def _accumulate_edges(self, betweenness, V, P, sigma, s):
     delta = dict.fromkeys(V, 0)
     while V:
@@ -354,36 +1131,202 @@ class Graph:
   def _rescale_e(self, betweenness, normalized):
     scale = 1
     if normalized:
-      n = len(self.vertices)
+      n = self.number_of_vertices()
       if n > 1:
         scale = 1 / (n* (n-1))
-    elif self.undirect:
+    elif self.undirected:
       scale = 0.5
     for v in betweenness:
       betweenness[v] *= scale
     return betweenness
   
-  def generate_random_graph(self, n, p):
+  def _rescale_v(self, betweenness, normalized):
+    scale = 1
+    if normalized:
+      n = self.number_of_vertices()
+      if n > 2:
+        scale = 1 / ((n-1) * (n-2))
+    elif self.undirected:
+      scale = 0.5
+    for v in betweenness:
+      betweenness[v] *= scale
+    return betweenness
+
+  def generate_random_graph(self, n, p, seed=None):
+    '''
+      replace the graph by a G(n, p) random graph over the vertices '1'..'n',
+      see generate_gnp
+    '''
+    sources, targets = gnp_edges(n, p, self.undirected, seed)
+    labels = [str(i+1) for i in range(n)]
+    self._generate(labels, [labels[u] for u in sources], [labels[v] for v in targets])
+
+  def generate_gnp(self, n, p, seed=None):
+    '''
+      replace the graph by a G(n, p) random graph over the vertices 0..n-1,
+      each pair (ordered pair if directed) being an edge with probability p
+    '''
+    self._generate(range(n), *gnp_edges(n, p, self.undirected, seed))
+
+  def generate_gnm(self, n, m, seed=None):
+    '''
+      replace the graph by a random graph with n vertices and m edges
+    '''
+    self._generate(range(n), *gnm_edges(n, m, self.undirected, seed))
+
+  def generate_barabasi_albert(self, n, m, seed=None):
+    '''
+      replace the graph by a Barabasi-Albert preferential attachment graph,
+      every new vertex links to m earlier ones (edges point from new to old
+      vertices on directed graphs)
+    '''
+    self._generate(range(n), *barabasi_albert_edges(n, m, seed))
+
+  def generate_rmat(self, scale, edge_factor=16, a=0.57, b=0.19, c=0.19, seed=None):
+    '''
+      replace the graph by an R-MAT graph over 2**scale vertices with up to
+      edge_factor * 2**scale edges, repeated edges are merged and
+      self-loops dropped
+    '''
+    self._generate(range(1 << scale), *rmat_edges(scale, edge_factor, a, b, c, seed))
+
+  def generate_random_regular(self, n, d, seed=None):
+    '''
+      replace the graph by a random simple undirected d-regular graph
+    '''
+    if not self.undirected:
+      raise ValueError('Random regular graphs are undirected.')
+    self._generate(range(n), *random_regular_edges(n, d, seed))
+
+  @writing
+  def _generate(self, vertices, sources, targets):
     self.clear()
-    for i in range(n):
-      self.add_vertex(str(i+1))
-    for i in self.vertices:
-      for j in self.vertices:
-        if (i != j and random.random() < p):
-          self.add_edge(i, j)
+    self.V.add_many(vertices)
+    if self._connectivity is not None:
+      for v in vertices:
+        self._connectivity.add(v)
+    self.add_edges_from_arrays(sources, targets, allow_add_vertex=False)
           
+  '''
+  -------------------sparse matrices-------------------------
+  '''
+
+  @reading
+  def to_sparse_adjacency(self, weight='weight'):
+    '''
+      the adjacency as a scipy.sparse CSR matrix, rows and columns in the
+      order of vertices; weight=None gives a 0/1 matrix
+    '''
+    return sparse.adjacency_matrix(self.freeze(), weight)
+
+  @reading
+  def laplacian_matrix(self, weight='weight', normalized=False):
+    '''
+      D - A (out-degrees on directed graphs), or I - D^-1/2 A D^-1/2
+    '''
+    return sparse.laplacian_matrix(self.to_sparse_adjacency(weight), normalized)
+
+  @reading
+  def transition_matrix(self, weight='weight'):
+    '''
+      the random-walk matrix D^-1 A, rows of vertices without out-edges
+      are zero
+    '''
+    return sparse.transition_matrix(self.to_sparse_adjacency(weight))
+
+  @classmethod
+  def from_sparse(cls, matrix, labels=None, undirected=True, weight='weight', **kwargs):
+    '''
+      a graph with an edge (labels[i], labels[j]) for every nonzero entry
+      of a square (scipy.sparse or dense) matrix, weighted by the entry
+      unless weight is None; undirected graphs read the upper triangle
+
+      labels default to 0..n-1, kwargs go to Graph()
+    '''
+    sparse._require()
+    A = sparse.sp.coo_matrix(matrix)
+    n = A.shape[0]
+    if A.shape != (n, n):
+      raise ValueError('The matrix must be square.')
+    if labels is None:
+      labels = range(n)
+    elif len(labels) != n:
+      raise ValueError('There must be one label per row.')
+    keep = A.data != 0
+    if undirected:
+      keep &= A.row <= A.col
+    G = cls(undirected=undirected, **kwargs)
+    G.V.add_many(labels)
+    labels = list(labels)
+    G.add_edges_from_arrays([labels[i] for i in A.row[keep].tolist()], [labels[j] for j in A.col[keep].tolist()],
+      weights=A.data[keep] if weight is not None else None, allow_add_vertex=False)
+    return G
+
+  def _vertex_values(self, x):
+    return dict(zip(self.freeze().labels, x.tolist()))
+
+  @reading
+  @cached
+  @spanned
+  def pagerank(self, alpha=0.85, weight='weight', tol=1e-6, max_iter=100):
+    '''
+      PageRank with damping alpha, by power iteration with sparse
+      matrix-vector products until the L1 change is below n * tol
+    '''
+    return self._vertex_values(sparse.pagerank(self.to_sparse_adjacency(weight), alpha, None, tol, max_iter))
+
+  @reading
+  @spanned
+  def personalized_pagerank(self, personalization, alpha=0.85, weight='weight', tol=1e-6, max_iter=100):
+    '''
+      PageRank whose random jumps go to the given vertices, personalization
+      is a list of vertices or a dict from vertex to jump weight
+    '''
+    if not isinstance(personalization, dict):
+      personalization = dict.fromkeys(personalization, 1.0)
+    index = self.freeze().index
+    p = [0.0] * len(index)
+    for v, value in personalization.items():
+      p[index[v]] = value
+    return self._vertex_values(sparse.pagerank(self.to_sparse_adjacency(weight), alpha, p, tol, max_iter))
+
+  @reading
+  @cached
+  @spanned
+  def eigenvector_centrality(self, weight='weight', tol=1e-6, max_iter=100):
+    '''
+      eigenvector centrality (from in-edges on directed graphs), normalized
+      to unit Euclidean norm
+    '''
+    return self._vertex_values(sparse.eigenvector_centrality(self.to_sparse_adjacency(weight), tol, max_iter))
+
+  @reading
+  @cached
+  @spanned
+  def katz_centrality(self, alpha=0.1, beta=1.0, weight='weight', tol=1e-6, max_iter=1000, normalized=True):
+    '''
+      Katz centrality x = alpha A^T x + beta, alpha must be below the
+      inverse of the largest eigenvalue of the adjacency matrix
+    '''
+    return self._vertex_values(sparse.katz_centrality(self.to_sparse_adjacency(weight), alpha, beta, tol, max_iter, normalized))
+
   '''
   -------------------cliques-------------------------
   '''
   @property
+  @reading
+  @cached
+  @spanned
   def max_cliques(self):
-    if len(self.vertices) == 0:
+    if self._csr is not None:
+      return self._csr.max_cliques()
+    if len(self.V) == 0:
       return []
     cliques = []
-    N = {u: {v for v in self.neighbors(u) if v != u} for u in self.vertices}
+    N = {u: {v for v in self.E.neighbors(u) if v != u} for u in self.V._vertices}
     Q = [None]
-    PX = set(self.vertices)
-    P = set(self.vertices)
+    PX = set(self.V._vertices)
+    P = set(self.V._vertices)
     stack = []
 
     while True:
@@ -412,14 +1355,45 @@ class Graph:
           break
     return cliques
 
+  def iter_cliques(self, min_size=1, workers=None):
+    '''
+      generate the maximal cliques with at least min_size vertices, the same
+      set as max_cliques on undirected graphs (in another order); edge
+      directions are ignored
+
+      workers: split the search over a pool of worker processes
+    '''
+    csr = self.freeze()
+    labels = csr.labels
+    for clique in iter_cliques(self._clique_neighbors(csr), min_size, workers):
+      yield [labels[v] for v in clique]
+
+  def _clique_neighbors(self, csr):
+    offsets, targets = csr.offsets, csr.targets
+    neighbors = [set(targets[offsets[v]:offsets[v+1]]) for v in range(len(csr))]
+    if not csr.undirected:
+      r_offsets, r_targets = csr.r_offsets, csr.r_targets
+      for v, nbrs in enumerate(neighbors):
+        nbrs.update(r_targets[r_offsets[v]:r_offsets[v+1]])
+    for v, nbrs in enumerate(neighbors):
+      nbrs.discard(v)
+    return neighbors
+
   '''
   -------------------connect-------------------------
   '''
   @property
+  @reading
+  @cached
+  @spanned
   def connected_components(self):
+    if self.undirected and self._connectivity is not None:
+      return self._connectivity_index().groups()
+    if self._csr is not None:
+      return self._csr.connected_components()
     components = []
     seen = set()
-    for v in self.vertices:
+    for v in self.V._vertices:
       if v not in seen:
         c = self._fast_bfs(v)
         seen.update(c)
@@ -435,64 +1409,689 @@ class Graph:
       for v in thislevel:
         if v not in seen:
           seen.add(v)
-          nextlevel.update(self.neighbors(v))
+          nextlevel.update(self.E.neighbors(v))
     return list(seen)
 
+  @reading
+  @cached
   def find_isolated_vertices(self):
+    if self._csr is not None:
+      return self._csr.find_isolated_vertices()
     isolated = []
-    for v in self.vertices:
-      if not self.neighbors(v) and not self.reverse_neighbors(v):
+    for v in self.V._vertices:
+      if not self.E.out_degree(v) and not self.E.in_degree(v):
         isolated.append(v)
     return isolated
     
+  @reading
+  @cached
   def find_path(self, start, end, path=None):
-    if start not in self.vertices or end not in self.vertices:
+    '''
+      some simple path from start to end found by depth-first search, not
+      necessarily the shortest one (see shortest_path)
+    '''
+    if start not in self.V or end not in self.V:
       return None
-    if not path:
-      path = []
-
-    path = path + [start]
+    path = list(path) if path else []
+    path.append(start)
     if start == end:
       return path
-    for n in self.neighbors(start):
-      if n not in path:
-        extend_path = self.find_path(n, end, path)
-        if extend_path:
-          return extend_path        
+    on_path = set(path)
+    stack = [iter(self.E.neighbors(start))]
+    while stack:
+      for n in stack[-1]:
+        if n not in on_path:
+          path.append(n)
+          on_path.add(n)
+          if n == end:
+            return path
+          stack.append(iter(self.E.neighbors(n)))
+          break
+      else:
+        stack.pop()
+        on_path.discard(path.pop())
     return None
     
+  @reading
+  @cached
+  @spanned
   def find_all_paths(self, start, end, path=None):
-    if start not in self.vertices or end not in self.vertices:
-      return []
-    if not path:
-      path = []
+    '''
+      all simple paths from start to end, see iter_paths
+    '''
+    return list(self._iter_paths(start, end, path))
+
+  def iter_paths(self, source, target, max_length=None, limit=None, shortest=False, weight='weight'):
+    '''
+      generate simple paths from source to target lazily, so the caller can
+      stop early without paying for the full enumeration
+
+      max_length: skip paths with more than max_length edges
+      limit: stop after limit paths
+      shortest: yield the paths from the shortest up (Yen's k shortest
+      simple paths), by edge weight or, with weight=None, by hop count;
+      otherwise they come in depth-first order, as in find_all_paths
+
+      the graph must not change while the generator is in use
+    '''
+    if shortest:
+      paths = self._k_shortest_paths(source, target, weight, max_length)
+    else:
+      paths = self._iter_paths(source, target, None, max_length)
+    return islice(self._guarded(paths), limit)
 
-    path = path + [start]
+  def _iter_paths(self, start, end, path=None, max_length=None):
+    # depth-first search with an explicit stack of neighbor iterators
+    if start not in self.V or end not in self.V:
+      return
+    path = list(path) if path else []
+    path.append(start)
     if start == end:
-      return [path]
-    paths = []
-    for n in self.neighbors(start):
-      if n not in path:
-        for p in self.find_all_paths(n, end, path):
-          paths.append(p)
-    return paths
+      yield path
+      return
+    if max_length is not None and max_length < 1:
+      return
+    neighbors = self.E.neighbors
+    on_path = set(path)
+    stack = [iter(neighbors(start))]
+    while stack:
+      for n in stack[-1]:
+        if n in on_path:
+          continue
+        if n == end:
+          yield path + [n]
+        elif max_length is None or len(stack) < max_length:
+          path.append(n)
+          on_path.add(n)
+          stack.append(iter(neighbors(n)))
+          break
+      else:
+        stack.pop()
+        if stack:
+          on_path.discard(path.pop())
+
+  def _k_shortest_paths(self, source, target, weight, max_length=None):
+    # Yen's algorithm: every next path deviates from an earlier one at a
+    # spur vertex, after which it avoids the edges used by the earlier
+    # paths sharing the same root; with max_length the spur searches are
+    # capped by hop count, so no candidate is ever too long
+    if weight not in (None, 'weight'):
+      raise ValueError(f'Unknown edge weight {weight}.')
+    if source not in self.V or target not in self.V:
+      return
+    length = self._path_weight if weight is not None else lambda p: len(p) - 1
+    first = self._restricted_shortest_path(source, target, weight is not None, set(), set(), max_length)
+    if first is None:
+      return
+    found = [first]
+    candidates = []
+    seen = {tuple(first)}
+    counter = count()
+    while True:
+      path = found[-1]
+      yield path
+      for i in range(len(path) - 1):
+        root = path[:i+1]
+        banned_edges = set()
+        for p in found:
+          if p[:i+1] == root and len(p) > i + 1:
+            banned_edges.add((p[i], p[i+1]))
+            if self.undirected:
+              banned_edges.add((p[i+1], p[i]))
+        hops = None if max_length is None else max_length - i
+        spur = self._restricted_shortest_path(path[i], target, weight is not None, set(root[:-1]), banned_edges, hops)
+        if spur is not None:
+          candidate = root[:-1] + spur
+          if tuple(candidate) not in seen:
+            seen.add(tuple(candidate))
+            heappush(candidates, (length(candidate), next(counter), candidate))
+      if not candidates:
+        return
+      found.append(heappop(candidates)[2])
+
+  def _path_weight(self, path):
+    E = self.E
+    default, absent = self.default_e_weight, self.default_e_absent_weight
+    return sum(E.weight(u, v, default, absent) for u, v in zip(path, path[1:]))
+
+  def _restricted_shortest_path(self, source, target, weighted, banned_vertices, banned_edges, max_hops=None):
+    # Dijkstra avoiding some vertices and (directed) edges
+    if max_hops is not None:
+      return self._hop_bounded_path(source, target, weighted, banned_vertices, banned_edges, max_hops)
+    E = self.E
+    default, absent = self.default_e_weight, self.default_e_absent_weight
+    pred = {source: None}
+    dist = {source: 0}
+    settled = set()
+    Q = [(0, 0, source)]
+    c = count(1)
+    while Q:
+      d, _, v = heappop(Q)
+      if v in settled:
+        continue
+      if v == target:
+        path = []
+        while v is not None:
+          path.append(v)
+          v = pred[v]
+        return path[::-1]
+      settled.add(v)
+      for w in E.neighbors(v):
+        if w in settled or w in banned_vertices or (v, w) in banned_edges:
+          continue
+        if weighted:
+          vw = E.weight(v, w, default, absent)
+          if vw < 0:
+            raise ValueError('Negative edge weights are not supported.')
+        else:
+          vw = 1
+        if d + vw < dist.get(w, inf):
+          dist[w] = d + vw
+          pred[w] = v
+          heappush(Q, (d + vw, next(c), w))
+    return None
+    
+  def _hop_bounded_path(self, source, target, weighted, banned_vertices, banned_edges, max_hops):
+    '''
+      the shortest path of at most max_hops edges avoiding some vertices and
+      (directed) edges, by max_hops rounds of Bellman-Ford; an update must
+      beat every walk with fewer edges, so with non-negative weights the
+      walks it records are simple paths
+    '''
+    E = self.E
+    default, absent = self.default_e_weight, self.default_e_absent_weight
+    dist = {source: 0}
+    updates = [{source: None}] # updates[k]: vertex -> predecessor, for the walks improved by their k-th edge
+    changed = [source]
+    for _ in range(max_hops):
+      improved = {}
+      for v in changed:
+        d = dist[v]
+        for w in E.neighbors(v):
+          if w in banned_vertices or (v, w) in banned_edges:
+            continue
+          if weighted:
+            vw = E.weight(v, w, default, absent)
+            if vw < 0:
+              raise ValueError('Negative edge weights are not supported.')
+          else:
+            vw = 1
+          # compare with the walks of the previous rounds only
+          if d + vw < dist.get(w, inf) and (w not in improved or d + vw < improved[w][0]):
+            improved[w] = (d + vw, v)
+      if not improved:
+        break
+      for w, (d, v) in improved.items():
+        dist[w] = d
+      updates.append({w: v for w, (_, v) in improved.items()})
+      changed = list(improved)
+    if target not in dist:
+      return None
+    path = [target]
+    v, k = target, len(updates) - 1
+    while v != source:
+      while v not in updates[k]:
+        k -= 1
+      v = updates[k][v]
+      path.append(v)
+      k -= 1
+    return path[::-1]
     
-  def diameter(self):
+  '''
+  -------------------shortest path-------------------------
+  '''
+
+  @reading
+  @cached
+  def shortest_path(self, source, target, weight='weight', heuristic=None):
+    '''
+      a shortest path from source to target as a list of vertices, None if
+      there is none
+
+      weight: 'weight' to use edge weights, None to count hops; graphs
+      without weights always use bidirectional BFS, weighted ones
+      bidirectional Dijkstra
+      heuristic: heuristic(v, target) estimating the remaining distance,
+      switches to A*; it must never overestimate for the path to be shortest
+    '''
+    return self._shortest_path(source, target, weight, heuristic)[1]
+
+  @reading
+  @cached
+  def shortest_path_length(self, source, target, weight='weight', heuristic=None):
+    '''
+      the length of a shortest path from source to target, inf if there is none
+    '''
+    return self._shortest_path(source, target, weight, heuristic)[0]
+
+  @spanned
+  def _shortest_path(self, source, target, weight, heuristic):
+    if weight not in (None, 'weight'):
+      raise ValueError(f'Unknown edge weight {weight}.')
+    if source not in self.V or target not in self.V:
+      return inf, None
+    if source == target:
+      return 0, [source]
+    if heuristic is not None:
+      return self._astar(source, target, weight, heuristic)
+    if weight is None or self._unit_weights:
+      dist, path = self._bidirectional_bfs(source, target)
+      if weight is not None and path is not None:
+        dist *= self.default_e_weight
+      return dist, path
+    return self._bidirectional_dijkstra(source, target)
+
+  def _join_path(self, pred, succ, meet):
+    path = []
+    v = meet
+    while v is not None:
+      path.append(v)
+      v = pred[v]
+    path.reverse()
+    v = succ[meet]
+    while v is not None:
+      path.append(v)
+      v = succ[v]
+    return path
+
+  def _bidirectional_bfs(self, source, target):
+    pred = {source: None}
+    succ = {target: None}
+    forward = [source]
+    backward = [target]
+    while forward and backward:
+      # expand the smaller frontier
+      if len(forward) <= len(backward):
+        frontier, forward = forward, []
+        for v in frontier:
+          for w in self.E.neighbors(v):
+            if w not in pred:
+              pred[w] = v
+              forward.append(w)
+              if w in succ:
+                path = self._join_path(pred, succ, w)
+                return len(path) - 1, path
+      else:
+        frontier, backward = backward, []
+        for v in frontier:
+          for w in self.E.reverse_neighbors(v):
+            if w not in succ:
+              succ[w] = v
+              backward.append(w)
+              if w in pred:
+                path = self._join_path(pred, succ, w)
+                return len(path) - 1, path
+    return inf, None
+
+  def _bidirectional_dijkstra(self, source, target):
+    E = self.E
+    default, absent = self.default_e_weight, self.default_e_absent_weight
+    dists = ({}, {})
+    seen = ({source: 0}, {target: 0})
+    links = ({source: None}, {target: None}) # pred and succ
+    c = count()
+    fringe = ([(0, next(c), source)], [(0, next(c), target)])
+    best, meet = inf, None
+    direction = 1
+    while fringe[0] and fringe[1]:
+      direction = 1 - direction
+      d, _, v = heappop(fringe[direction])
+      if v in dists[direction]:
+        continue
+      dists[direction][v] = d
+      if v in dists[1 - direction]:
+        break
+      if direction == 0:
+        edges = ((w, E.weight(v, w, default, absent)) for w in E.neighbors(v))
+      else:
+        edges = ((w, E.weight(w, v, default, absent)) for w in E.reverse_neighbors(v))
+      for w, cost in edges:
+        vw_dist = d + cost
+        if w in dists[direction]:
+          continue
+        if w not in seen[direction] or vw_dist < seen[direction][w]:
+          seen[direction][w] = vw_dist
+          links[direction][w] = v
+          heappush(fringe[direction], (vw_dist, next(c), w))
+          if w in seen[1 - direction]:
+            total = vw_dist + seen[1 - direction][w]
+            if total < best:
+              best, meet = total, w
+    if meet is None:
+      return inf, None
+    return best, self._join_path(links[0], links[1], meet)
+
+  def _astar(self, source, target, weight, heuristic):
+    E = self.E
+    default, absent = self.default_e_weight, self.default_e_absent_weight
+    c = count()
+    queue = [(heuristic(source, target), next(c), source, 0, None)]
+    enqueued = {}
+    explored = {}
+    while queue:
+      _, _, v, d, parent = heappop(queue)
+      if v in explored:
+        continue
+      explored[v] = parent
+      if v == target:
+        path = [v]
+        while parent is not None:
+          path.append(parent)
+          parent = explored[parent]
+        path.reverse()
+        return d, path
+      for w in E.neighbors(v):
+        if w in explored:
+          continue
+        vw_dist = d + (E.weight(v, w, default, absent) if weight is not None else 1)
+        if w in enqueued:
+          known, h = enqueued[w]
+          if known <= vw_dist:
+            continue
+        else:
+          h = heuristic(w, target)
+        enqueued[w] = vw_dist, h
+        heappush(queue, (vw_dist + h, next(c), w, vw_dist, v))
+    return inf, None
+
+  '''
+  -------------------single source-------------------------
+  '''
+
+  @reading
+  @cached
+  def distances(self, source, weight='weight', cutoff=None, predecessors=False, queue='auto'):
+    '''
+      shortest distances from source to every reachable vertex
+
+      weight: 'weight' to use edge weights, None to count hops
+      cutoff: ignore vertices farther than cutoff
+      predecessors: also return the shortest-path tree as {vertex: parent}
+      queue: 'bfs' (unit weights), 'radix' (integer weights), 'heap' or a
+      class with push(key, value), pop() and len(); 'auto' picks the
+      cheapest that fits the weights
+    '''
+    return self.multi_source_distances([source], weight, cutoff, predecessors, queue)
+
+  @reading
+  @spanned
+  def multi_source_distances(self, sources, weight='weight', cutoff=None, predecessors=False, queue='auto'):
+    '''
+      shortest distances from the nearest of several sources, see distances
+    '''
+    engine = self._shortest_paths(weight)
+    index = engine.csr.index
+    engine.instrumentation = self.instrumentation
+    engine.run([self._source_id(index, s) for s in sources], cutoff, queue)
+    if predecessors:
+      return engine.distances(), engine.predecessors()
+    return engine.distances()
+
+  def distances_from(self, sources, weight='weight', cutoff=None, predecessors=False, queue='auto'):
+    '''
+      yield (source, distances) for each source, reusing one set of buffers
+      for the whole batch
+    '''
+    return self._guarded(self._distances_from(sources, weight, cutoff, predecessors, queue))
+
+  def _distances_from(self, sources, weight, cutoff, predecessors, queue):
+    engine = self._shortest_paths(weight)
+    index = engine.csr.index
+    engine.instrumentation = self.instrumentation
+    for s in sources:
+      engine.run([self._source_id(index, s)], cutoff, queue)
+      yield s, (engine.distances(), engine.predecessors()) if predecessors else engine.distances()
+
+  @staticmethod
+  def _source_id(index, source):
+    i = index.get(source)
+    if i is None:
+      raise ValueError(f'Unknown source vertex {source!r}.')
+    return i
+
+  def _shortest_paths(self, weight):
+    if weight not in (None, 'weight'):
+      raise ValueError(f'Unknown edge weight {weight}.')
+    csr = self.freeze()
+    # the engines hold per-query buffers, so they belong to this graph (a
+    # snapshot sharing the immutable CSR gets its own) and concurrent
+    # readers each get theirs
+    key = weight if self._lock is None else (weight, get_ident())
+    engine = self._engines.get(key)
+    if engine is None or engine.csr is not csr:
+      engine = self._engines[key] = ShortestPaths(csr, weighted=weight is not None)
+    return engine
+
+  '''
+  -------------------distance-------------------------
+  '''
+
+  @property
+  def _unit_weights(self):
+    '''
+      True when every edge weighs default_e_weight, so BFS can replace Dijkstra
+    '''
+    if self._csr is not None:
+      return self._csr.unit_weights
+    return not self.E.has_weights and self.default_e_weight > 0
+
+  def _use_weights(self, weighted):
+    if weighted is not None:
+      return weighted
+    return 'weight' in self.freeze().edge_attrs
+
+  def _eccentricity_engine(self, weighted):
+    engine = self._shortest_paths('weight' if weighted else None)
+    engine.instrumentation = self.instrumentation
+    return engine
+
+  def _eccentricity_from(self, engine, source):
+    '''
+      the eccentricity of the vertex id source, inf if some vertex is
+      unreachable; its distances stay in the engine buffers
+    '''
+    engine.run([source])
+    if self.instrumentation is not None:
+      self.instrumentation.count('eccentricity_searches')
+    touched = engine.touched
+    if len(touched) < len(engine.dist):
+      return inf
+    dist = engine.dist
+    return max(dist[v] for v in touched)
+
+  def _eccentricities(self, engine, sources, cutoff=None):
+    '''
+      the eccentricities of many vertex ids on an unweighted engine, from
+      bit-parallel searches over batches of sources sized to bound memory
+    '''
+    batch = max(64, _BATCH_BITS // len(engine.dist))
+    ecc = []
+    for i in range(0, len(sources), batch):
+      ecc.extend(engine.eccentricities(sources[i:i+batch], cutoff))
+      if self.instrumentation is not None:
+        self.instrumentation.count('eccentricity_searches')
+    return ecc
+
+  @reading
+  @cached
+  @spanned
+  def eccentricity(self, v=None, weighted=None, method='auto'):
+    '''
+      the greatest distance from v to any other vertex (inf if some vertex
+      is unreachable); with v=None a dict of all eccentricities
+
+      weighted: use edge weights (Dijkstra) or hop counts (BFS), by default
+      weights are used when any edge carries a weight attribute
+      method: 'bfs' searches from every vertex (bit-parallel batches of
+      sources without weights), 'bound' prunes with eccentricity bounds,
+      'auto' picks 'bound' when it applies
+    '''
+    weighted = self._use_weights(weighted)
+    if v is not None:
+      engine = self._eccentricity_engine(weighted)
+      source = engine.csr.index.get(v)
+      return inf if source is None else self._eccentricity_from(engine, source)
+    return self._extrema('eccentricity', weighted, method)
+
+  @reading
+  @cached
+  def diameter(self, weighted=None, method='auto'):
+    if not self.is_connected():
+      return inf
+    return self._extrema('diameter', self._use_weights(weighted), method)
+
+  @reading
+  @cached
+  def radius(self, weighted=None, method='auto'):
     if not self.is_connected():
       return inf
-    V = self.vertices
-    pairs = [(V[i], V[j]) for i in range(len(V)-1) for j in range(i+1, len(V))]
-    smallest_paths = []
-    for (s,e) in pairs:
-      paths = self.find_all_paths(s,e)
-      smallest = sorted(paths, key=len)[0]
-      smallest_paths.append(smallest)
-    smallest_paths.sort(key=len)
-    diameter = len(smallest_paths[-1])-1
-    return diameter
+    return self._extrema('radius', self._use_weights(weighted), method)
+
+  @reading
+  @cached
+  def center(self, weighted=None, method='auto'):
+    return self._extrema('center', self._use_weights(weighted), method)
+
+  @reading
+  @cached
+  def periphery(self, weighted=None, method='auto'):
+    return self._extrema('periphery', self._use_weights(weighted), method)
+
+  @spanned
+  def _extrema(self, compute, weighted, method):
+    # every search runs on the frozen CSR through a reused engine
+    csr = self.freeze()
+    n = len(csr)
+    if not n:
+      return {} if compute == 'eccentricity' else [] if compute in ('center', 'periphery') else 0
+    if method not in ('auto', 'bfs', 'bound'):
+      raise ValueError(f'Unknown method {method}.')
+    if method == 'bound' and (weighted or not self.undirected):
+      raise ValueError('Bound pruning needs an undirected graph without edge weights.')
+    if method == 'auto':
+      method = 'bound' if self.undirected and not weighted and self.is_connected() else 'bfs'
+    engine = self._eccentricity_engine(weighted)
+    if method == 'bound':
+      if not self.is_connected():
+        raise ValueError('Bound pruning needs a connected graph.')
+      if compute == 'diameter':
+        return self._ifub(engine)
+      ecc_lower, ecc_upper = self._bounding_eccentricities(compute, engine)
+    elif engine.weighted:
+      ecc_lower = ecc_upper = [self._eccentricity_from(engine, v) for v in range(n)]
+    else:
+      ecc_lower = ecc_upper = self._eccentricities(engine, range(n))
+    labels = csr.labels
+    if compute == 'eccentricity':
+      return dict(zip(labels, ecc_lower))
+    if compute in ('diameter', 'periphery'):
+      d = max(ecc_lower)
+      return d if compute == 'diameter' else [labels[v] for v in range(n) if ecc_lower[v] == d]
+    r = min(ecc_upper)
+    return r if compute == 'radius' else [labels[v] for v in range(n) if ecc_upper[v] == r]
+
+  def _ifub(self, engine):
+    '''
+      the diameter of a connected undirected unweighted graph by iFUB
+      (Crescenzi et al.): a BFS from a central vertex found by a 4-sweep,
+      then the eccentricities of its fringe, farthest level first and one
+      bit-parallel search per level, until the closer levels can no longer
+      beat the largest eccentricity found
+    '''
+    csr = engine.csr
+    offsets = csr.offsets
+    dist, pred = engine.dist, engine.pred
+
+    def sweep(source):
+      # eccentricity of source, the farthest vertex and the vertex halfway to it
+      ecc = self._eccentricity_from(engine, source)
+      far = middle = engine.touched[-1]
+      for _ in range(ecc // 2):
+        middle = pred[middle]
+      return ecc, far, middle
+
+    start = max(range(len(csr)), key=lambda v: offsets[v+1] - offsets[v])
+    lower, a, _ = sweep(start)
+    ecc, _, start = sweep(a)
+    lower = max(lower, ecc)
+    ecc, a, _ = sweep(start)
+    lower = max(lower, ecc)
+    ecc, _, center = sweep(a)
+    lower = max(lower, ecc)
+
+    i = self._eccentricity_from(engine, center)
+    lower = max(lower, i)
+    fringes = [[] for _ in range(i + 1)]
+    for v in engine.touched:
+      fringes[dist[v]].append(v)
+    # a pair of vertices within level i - 1 of the center is at most
+    # 2(i - 1) apart, so the farther levels decide the rest
+    upper = 2 * i
+    while upper > lower:
+      lower = max(lower, *self._eccentricities(engine, fringes[i]))
+      i -= 1
+      upper = 2 * i
+    return lower
+
+  def _bounding_eccentricities(self, compute, engine):
+    '''
+      exact eccentricity extrema of a connected undirected unweighted graph
+      with as few BFS runs as possible (Takes & Kosters, bounding diameters);
+      once a BFS rules out fewer candidates than a bit-parallel search
+      settles for the cost of one, the rest are settled in batches
+
+      returns lower and upper eccentricity bounds per vertex id; they
+      coincide for every vertex that can affect the requested quantity
+    '''
+    n = len(engine.csr)
+    offsets = engine.csr.offsets
+    dist = engine.dist
+    ecc_lower = [0] * n
+    ecc_upper = [n] * n
+    # the periphery is the vertices whose eccentricity is the diameter
+    diameter = self._ifub(engine) if compute == 'periphery' else n
+    radius = n # the smallest eccentricity found
+    candidates = set(range(n))
+    current = max(candidates, key=lambda v: offsets[v+1] - offsets[v])
+    high = False
+    while candidates:
+      current_ecc = self._eccentricity_from(engine, current)
+      radius = min(radius, current_ecc)
+      for v in candidates:
+        d = dist[v]
+        ecc_lower[v] = max(ecc_lower[v], d, current_ecc - d)
+        ecc_upper[v] = min(ecc_upper[v], current_ecc + d, diameter)
+      if compute == 'radius':
+        ruled_out = {v for v in candidates if ecc_lower[v] >= radius}
+      elif compute == 'center':
+        ruled_out = {v for v in candidates if ecc_lower[v] > radius}
+      elif compute == 'periphery':
+        ruled_out = {v for v in candidates if ecc_upper[v] < diameter}
+      else:
+        ruled_out = set()
+      ruled_out.update(v for v in candidates if ecc_lower[v] == ecc_upper[v])
+      candidates -= ruled_out
+      if not candidates:
+        break
+      if len(ruled_out) < 64:
+        rest = sorted(candidates)
+        # with the diameter known, a search may stop one level short of it
+        cutoff = diameter - 1 if compute == 'periphery' else None
+        for v, ecc in zip(rest, self._eccentricities(engine, rest, cutoff)):
+          ecc_lower[v] = ecc_upper[v] = ecc
+        break
+      # alternate between the most promising vertices of both ends
+      if high:
+        current = max(candidates, key=lambda v: (ecc_upper[v], ecc_lower[v]))
+      else:
+        current = min(candidates, key=lambda v: (ecc_lower[v], -ecc_upper[v]))
+      high = not high
+    return ecc_lower, ecc_upper
     
+  @reading
   def __repr__(self):
     return str({'V': self.vertices, 'E': self.edges})
   
+  @reading
   def to_dict(self):
     return {'V': self.detailed_vertices, 'E': self.detailed_edges}
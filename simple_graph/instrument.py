@@ -0,0 +1,123 @@
+import logging
+from time import perf_counter
+from contextlib import contextmanager
+from functools import wraps
+
+class Instrumentation:
+  '''
+    per-operation counters, observed values (e.g. BFS frontier sizes),
+    timing spans and events of a graph
+
+    counters and observations are aggregated in place, events and spans are
+    forwarded to the sinks; a graph without instrumentation only pays for
+    an "is None" check per operation
+  '''
+
+  def __init__(self, *sinks):
+    self.sinks = list(sinks)
+    self.reset()
+
+  def reset(self):
+    self.counters = {}
+    self.observations = {} # name -> [number of values, total, max]
+
+  def count(self, name, n=1):
+    self.counters[name] = self.counters.get(name, 0) + n
+
+  def observe(self, name, value):
+    stats = self.observations.get(name)
+    if stats is None:
+      self.observations[name] = [1, value, value]
+    else:
+      stats[0] += 1
+      stats[1] += value
+      if value > stats[2]:
+        stats[2] = value
+
+  def event(self, name, **fields):
+    for sink in self.sinks:
+      sink.event(name, fields)
+
+  @contextmanager
+  def span(self, name, **fields):
+    '''
+      time the enclosed block, the sinks get its duration and the counters
+      it increased
+    '''
+    before = dict(self.counters)
+    start = perf_counter()
+    try:
+      yield self
+    finally:
+      seconds = perf_counter() - start
+      if self.sinks:
+        fields['counters'] = {key: value - before.get(key, 0) for key, value in self.counters.items() if value != before.get(key, 0)}
+        for sink in self.sinks:
+          sink.span(name, seconds, fields)
+
+  def summary(self):
+    return {
+      'counters': dict(self.counters),
+      'observations': {name: {'count': c, 'total': t, 'max': m, 'mean': t / c} for name, (c, t, m) in self.observations.items()},
+    }
+
+class LoggingSink:
+  '''
+    write events and spans to a logger, by default "simple_graph"
+  '''
+
+  def __init__(self, logger=None, level=logging.INFO):
+    self.logger = logger if logger is not None else logging.getLogger('simple_graph')
+    self.level = level
+
+  def event(self, name, fields):
+    self.logger.log(self.level, '%s %s', name, fields)
+
+  def span(self, name, seconds, fields):
+    self.logger.log(self.level, '%s took %.6fs %s', name, seconds, fields)
+
+class CallbackSink:
+  '''
+    call callback(kind, name, data) with kind 'event' or 'span'; the data of
+    a span holds its 'seconds' next to its fields
+  '''
+
+  def __init__(self, callback):
+    self.callback = callback
+
+  def event(self, name, fields):
+    self.callback('event', name, fields)
+
+  def span(self, name, seconds, fields):
+    self.callback('span', name, dict(fields, seconds=seconds))
+
+class Recorder:
+  '''
+    keep events and spans in memory, e.g. for tests or profiling sessions
+  '''
+
+  def __init__(self):
+    self.events = [] # (name, fields)
+    self.spans = [] # (name, seconds, fields)
+
+  def event(self, name, fields):
+    self.events.append((name, fields))
+
+  def span(self, name, seconds, fields):
+    self.spans.append((name, seconds, fields))
+
+def spanned(method):
+  '''
+    run a graph method inside a span named after it when the graph is
+    instrumented
+  '''
+  name = method.__name__
+
+  @wraps(method)
+  def wrapper(self, *args, **kwargs):
+    instrumentation = self.instrumentation
+    if instrumentation is None:
+      return method(self, *args, **kwargs)
+    with instrumentation.span(name):
+      return method(self, *args, **kwargs)
+  return wrapper
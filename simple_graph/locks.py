@@ -0,0 +1,119 @@
+from threading import Condition, Lock, get_ident
+from contextlib import contextmanager
+from functools import wraps
+
+class RWLock:
+  '''
+    readers-writer lock: any number of readers or a single writer
+
+    waiting writers block new readers, so a stream of queries can not
+    starve updates. both sides are reentrant and the writing thread may
+    also read; a thread holding only a read lock can not upgrade to write
+  '''
+
+  def __init__(self):
+    self._condition = Condition(Lock())
+    self._readers = {} # thread id -> read depth
+    self._writer = None
+    self._write_depth = 0
+    self._waiting_writers = 0
+
+  def __getstate__(self):
+    # a pickled graph gets a fresh, unlocked lock
+    return {}
+
+  def __setstate__(self, state):
+    self.__init__()
+
+  def acquire_read(self):
+    me = get_ident()
+    with self._condition:
+      if self._writer == me or me in self._readers:
+        self._readers[me] = self._readers.get(me, 0) + 1
+        return
+      while self._writer is not None or self._waiting_writers:
+        self._condition.wait()
+      self._readers[me] = 1
+
+  def release_read(self):
+    me = get_ident()
+    with self._condition:
+      depth = self._readers[me] - 1
+      if depth:
+        self._readers[me] = depth
+      else:
+        del self._readers[me]
+        if not self._readers:
+          self._condition.notify_all()
+
+  def acquire_write(self):
+    me = get_ident()
+    with self._condition:
+      if self._writer == me:
+        self._write_depth += 1
+        return
+      if me in self._readers:
+        raise RuntimeError('A thread holding a read lock can not take the write lock.')
+      self._waiting_writers += 1
+      try:
+        while self._writer is not None or self._readers:
+          self._condition.wait()
+      finally:
+        self._waiting_writers -= 1
+      self._writer = me
+      self._write_depth = 1
+
+  def release_write(self):
+    with self._condition:
+      self._write_depth -= 1
+      if not self._write_depth:
+        self._writer = None
+        self._condition.notify_all()
+
+  @contextmanager
+  def read(self):
+    self.acquire_read()
+    try:
+      yield
+    finally:
+      self.release_read()
+
+  @contextmanager
+  def write(self):
+    self.acquire_write()
+    try:
+      yield
+    finally:
+      self.release_write()
+
+def reading(method):
+  '''
+    run a graph method under the read lock when the graph is concurrent
+  '''
+  @wraps(method)
+  def wrapper(self, *args, **kwargs):
+    lock = self._lock
+    if lock is None:
+      return method(self, *args, **kwargs)
+    lock.acquire_read()
+    try:
+      return method(self, *args, **kwargs)
+    finally:
+      lock.release_read()
+  return wrapper
+
+def writing(method):
+  '''
+    run a graph method under the write lock when the graph is concurrent
+  '''
+  @wraps(method)
+  def wrapper(self, *args, **kwargs):
+    lock = self._lock
+    if lock is None:
+      return method(self, *args, **kwargs)
+    lock.acquire_write()
+    try:
+      return method(self, *args, **kwargs)
+    finally:
+      lock.release_write()
+  return wrapper
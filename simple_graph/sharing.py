@@ -0,0 +1,62 @@
+import weakref
+
+class CopyOnWrite:
+  '''
+    bookkeeping for containers that hand out read-only snapshots sharing
+    their storage (see Graph.snapshot)
+
+    share() marks the container pending: its next write calls _detach() to
+    copy what the snapshots still reference, which is skipped once every
+    snapshot has been dropped. the snapshots are only weakly referenced, so
+    their memory goes as soon as the last reader lets go
+  '''
+  _pending = False
+  _snapshots = ()
+  _transient = () # attributes a pickled copy resets to None: copy tracking, graph hooks
+
+  def __getstate__(self):
+    # a pickled copy shares nothing
+    state = self.__dict__.copy()
+    state.pop('_pending', None)
+    state.pop('_snapshots', None)
+    for name in self._transient:
+      state[name] = None
+    return state
+
+  def _track(self, snapshot):
+    self._snapshots = [r for r in self._snapshots if r() is not None] + [weakref.ref(snapshot)]
+    self._pending = True
+
+  def _shared(self):
+    '''
+      True while a snapshot of this container is alive
+    '''
+    self._snapshots = [r for r in self._snapshots if r() is not None]
+    return bool(self._snapshots)
+
+  def _write(self):
+    '''
+      called before the first write after share()
+    '''
+    self._pending = False
+    if self._shared():
+      self._detach()
+
+  def _forget(self):
+    # the container got fresh storage (clear), nothing is shared anymore
+    self._pending = False
+    self._snapshots = ()
+
+def read_only_class(cls, name):
+  '''
+    a read-only subclass of a container class for snapshots, its mutators
+    raise TypeError
+  '''
+  def read_only(self, *args, **kwargs):
+    raise TypeError('A snapshot is read-only.')
+  mutators = [attr for attr in ('add', 'add_many', 'remove', 'remove_vertex', 'clear', 'set_weight', '_account',
+    '_account_many', 'allocate', 'extend', 'set_weights', 'fill_weights', 'fill_columns', 'release', 'reset', 'update', 'set',
+    'delete') if hasattr(cls, attr)]
+  namespace = {attr: read_only for attr in mutators}
+  namespace['__module__'] = cls.__module__
+  return type(name, (cls,), namespace)
@@ -0,0 +1,243 @@
+from math import inf
+from heapq import heappush, heappop
+from itertools import count
+
+class HeapQueue:
+  '''
+    binary heap priority queue (heapq), for any non-negative weights
+  '''
+
+  def __init__(self):
+    self._heap = []
+    self._count = count()
+
+  def __len__(self):
+    return len(self._heap)
+
+  def push(self, key, value):
+    heappush(self._heap, (key, next(self._count), value))
+
+  def pop(self):
+    key, _, value = heappop(self._heap)
+    return key, value
+
+class RadixHeap:
+  '''
+    monotone priority queue for non-negative integer keys: a popped key is
+    never larger than a later pushed one, as in Dijkstra
+  '''
+
+  def __init__(self):
+    self._buckets = [[]]
+    self._last = 0
+    self._size = 0
+
+  def __len__(self):
+    return self._size
+
+  def push(self, key, value):
+    if key < self._last:
+      raise ValueError('RadixHeap keys must not decrease.')
+    i = (key ^ self._last).bit_length()
+    while i >= len(self._buckets):
+      self._buckets.append([])
+    self._buckets[i].append((key, value))
+    self._size += 1
+
+  def pop(self):
+    buckets = self._buckets
+    if not buckets[0]:
+      i = 1
+      while not buckets[i]:
+        i += 1
+      bucket, buckets[i] = buckets[i], []
+      self._last = last = min(key for key, _ in bucket)
+      # every item moves to a lower bucket
+      for item in bucket:
+        buckets[(item[0] ^ last).bit_length()].append(item)
+    self._size -= 1
+    return buckets[0].pop()
+
+QUEUES = {'heap': HeapQueue, 'radix': RadixHeap}
+
+class ShortestPaths:
+  '''
+    single- and multi-source shortest paths over a CSRGraph
+
+    the distance and predecessor buffers are allocated once and only the
+    entries touched by a query are reset, so batches of queries do not
+    reallocate per source
+  '''
+
+  def __init__(self, csr, weighted=True):
+    self.csr = csr
+    n = len(csr)
+    self.weighted = weighted and not csr.unit_weights
+    self.unit = csr.default_weight if weighted else 1
+    if self.weighted:
+      if any(w < 0 for w in csr.weights):
+        raise ValueError('Negative edge weights are not supported.')
+      self.integer_weights = all(w == int(w) for w in csr.weights)
+    else:
+      self.integer_weights = self.unit == int(self.unit)
+    self.dist = [inf] * n
+    self.pred = [-1] * n
+    self.touched = []
+    self.instrumentation = None
+    self._weights = {} # integer -> per-edge weights for Dijkstra
+
+  def _edge_weights(self, integer):
+    # built on the first Dijkstra run and reused like the other buffers
+    weights = self._weights.get(integer)
+    if weights is None:
+      weights = self.csr.weights if self.weighted else [self.unit] * len(self.csr.targets)
+      if integer:
+        weights = [int(w) for w in weights]
+      self._weights[integer] = weights
+    return weights
+
+  def choose_queue(self, queue='auto'):
+    if queue == 'auto':
+      if not self.weighted:
+        return 'bfs'
+      return 'radix' if self.integer_weights else 'heap'
+    if queue == 'bfs' and self.weighted:
+      raise ValueError('BFS needs unit edge weights.')
+    if queue == 'radix' and not self.integer_weights:
+      raise ValueError('The radix heap needs integer edge weights.')
+    return queue
+
+  def _reset(self):
+    dist, pred = self.dist, self.pred
+    for i in self.touched:
+      dist[i] = inf
+      pred[i] = -1
+    self.touched = []
+
+  def run(self, sources, cutoff=None, queue='auto'):
+    '''
+      fill the buffers with the distances from the nearest of the source ids
+    '''
+    self._reset()
+    queue = self.choose_queue(queue)
+    dist, pred, touched = self.dist, self.pred, self.touched
+    for s in sources:
+      if dist[s] != 0:
+        dist[s] = 0
+        touched.append(s)
+    if queue == 'bfs':
+      self._bfs(cutoff)
+    else:
+      self._dijkstra(QUEUES[queue]() if isinstance(queue, str) else queue(), cutoff)
+
+  def _bfs(self, cutoff):
+    offsets, targets = self.csr.offsets, self.csr.targets
+    dist, pred, touched = self.dist, self.pred, self.touched
+    unit = self.unit
+    instrumentation = self.instrumentation
+    frontier = list(touched)
+    d = 0
+    while frontier:
+      if instrumentation is not None:
+        instrumentation.observe('bfs_frontier', len(frontier))
+      d += unit
+      if cutoff is not None and d > cutoff:
+        break
+      next_frontier = []
+      for v in frontier:
+        for k in range(offsets[v], offsets[v+1]):
+          w = targets[k]
+          if dist[w] == inf:
+            dist[w] = d
+            pred[w] = v
+            touched.append(w)
+            next_frontier.append(w)
+      frontier = next_frontier
+
+  def _dijkstra(self, Q, cutoff):
+    offsets, targets = self.csr.offsets, self.csr.targets
+    weights = self._edge_weights(isinstance(Q, RadixHeap))
+    dist, pred, touched = self.dist, self.pred, self.touched
+    settled = bytearray(len(dist))
+    for s in touched:
+      Q.push(0, s)
+    pushes = len(touched)
+    while Q:
+      d, v = Q.pop()
+      if settled[v] or d > dist[v]:
+        continue
+      settled[v] = 1
+      for k in range(offsets[v], offsets[v+1]):
+        w = targets[k]
+        vw_dist = d + weights[k]
+        if cutoff is not None and vw_dist > cutoff:
+          continue
+        if vw_dist < dist[w]:
+          if dist[w] == inf:
+            touched.append(w)
+          dist[w] = vw_dist
+          pred[w] = v
+          Q.push(vw_dist, w)
+          pushes += 1
+    instrumentation = self.instrumentation
+    if instrumentation is not None:
+      instrumentation.count('dijkstra_settled', len(touched))
+      instrumentation.count('heap_pushes', pushes)
+      instrumentation.count('relaxations', sum(offsets[v+1] - offsets[v] for v in touched))
+
+  def eccentricities(self, sources, cutoff=None):
+    '''
+      the eccentricities of the source ids from one bit-parallel BFS: bit j
+      of reached[v] is set once sources[j] reaches v, so every level is a
+      single pass over the frontier for all the sources at once. a source
+      that still reaches new vertices past cutoff gets cutoff + unit, one
+      that can not reach every vertex inf
+    '''
+    if self.weighted:
+      raise ValueError('Bit-parallel BFS needs unit edge weights.')
+    offsets, targets = self.csr.offsets, self.csr.targets
+    instrumentation = self.instrumentation
+    reached = [0] * len(self.dist)
+    for j, s in enumerate(sources):
+      reached[s] |= 1 << j
+    frontier = {s: reached[s] for s in sources}
+    levels = [] # the sources that reached new vertices at each level
+    while frontier and (cutoff is None or len(levels) * self.unit <= cutoff):
+      if instrumentation is not None:
+        instrumentation.observe('bfs_frontier', len(frontier))
+      next_frontier = {}
+      for v, bits in frontier.items():
+        for k in range(offsets[v], offsets[v+1]):
+          w = targets[k]
+          new = bits & ~reached[w]
+          if new:
+            reached[w] |= new
+            next_frontier[w] = next_frontier.get(w, 0) | new
+      frontier = next_frontier
+      active = 0
+      for bits in frontier.values():
+        active |= bits
+      levels.append(active)
+    everywhere = -1
+    for bits in reached:
+      everywhere &= bits
+    ecc = [0] * len(sources)
+    settled = 0
+    # a source's eccentricity is the last level it was active at
+    for level in range(len(levels), 0, -1):
+      bits = levels[level-1] & ~settled
+      settled |= bits
+      while bits:
+        low = bits & -bits
+        ecc[low.bit_length() - 1] = level * self.unit
+        bits ^= low
+    reaching = everywhere | (levels[-1] if frontier else 0) # the latter were cut off
+    return [e if reaching >> j & 1 else inf for j, e in enumerate(ecc)]
+
+  def distances(self):
+    labels, dist = self.csr.labels, self.dist
+    return {labels[i]: dist[i] for i in self.touched}
+
+  def predecessors(self):
+    labels, pred = self.csr.labels, self.pred
+    return {labels[i]: labels[pred[i]] if pred[i] >= 0 else None for i in self.touched}
@@ -0,0 +1,117 @@
+try:
+  import numpy as np
+  import scipy.sparse as sp
+except ImportError:
+  np = sp = None
+
+def _require():
+  if sp is None:
+    raise ImportError('numpy and scipy are required for sparse matrices.')
+
+def adjacency_matrix(csr, weight='weight'):
+  '''
+    n x n scipy CSR matrix with A[i, j] the weight of the edge from vertex
+    i to vertex j of a CSRGraph (1 for every edge with weight=None); an
+    undirected edge fills both A[i, j] and A[j, i]
+  '''
+  _require()
+  if weight not in (None, 'weight'):
+    raise ValueError(f'Unknown edge weight {weight}.')
+  arrays = csr.as_numpy()
+  n = len(csr)
+  data = arrays['weights'] if weight is not None else np.ones(len(arrays['targets']))
+  return sp.csr_matrix((data, arrays['targets'], arrays['offsets']), shape=(n, n))
+
+def laplacian_matrix(A, normalized=False):
+  '''
+    D - A with D the diagonal of the row sums of A, or its symmetric
+    normalization I - D^-1/2 A D^-1/2 (zero for vertices without edges)
+  '''
+  degrees = np.asarray(A.sum(axis=1)).ravel()
+  if not normalized:
+    return sp.diags(degrees) - A
+  scale = np.zeros_like(degrees)
+  np.divide(1.0, np.sqrt(degrees), out=scale, where=degrees > 0)
+  S = sp.diags(scale)
+  return sp.diags((degrees > 0).astype(float)) - S @ A @ S
+
+def transition_matrix(A):
+  '''
+    row-stochastic D^-1 A, the rows of vertices without out-edges are zero
+  '''
+  degrees = np.asarray(A.sum(axis=1)).ravel()
+  scale = np.zeros_like(degrees)
+  np.divide(1.0, degrees, out=scale, where=degrees != 0)
+  return sp.diags(scale) @ A
+
+def _converged(x, last, n, tol):
+  return np.abs(x - last).sum() < n * tol
+
+def pagerank(A, alpha=0.85, personalization=None, tol=1e-6, max_iter=100):
+  '''
+    PageRank by power iteration over the transition matrix; the random
+    jumps and the mass of dangling vertices follow the personalization
+    vector (uniform if None)
+  '''
+  n = A.shape[0]
+  if n == 0:
+    return np.zeros(0)
+  PT = transition_matrix(A).T.tocsr()
+  dangling = np.asarray(A.sum(axis=1)).ravel() == 0
+  if personalization is None:
+    p = np.full(n, 1.0 / n)
+  else:
+    p = np.asarray(personalization, dtype=float)
+    if p.sum() <= 0:
+      raise ValueError('The personalization vector must have a positive sum.')
+    p = p / p.sum()
+  x = p.copy()
+  for _ in range(max_iter):
+    last = x
+    x = alpha * (PT @ last) + (alpha * last[dangling].sum() + 1 - alpha) * p
+    if _converged(x, last, n, tol):
+      return x
+  raise RuntimeError(f'PageRank did not converge in {max_iter} iterations.')
+
+def eigenvector_centrality(A, tol=1e-6, max_iter=100):
+  '''
+    principal eigenvector of A^T by power iteration on I + A^T (the shift
+    avoids oscillation on bipartite graphs), with unit Euclidean norm
+  '''
+  n = A.shape[0]
+  if n == 0:
+    return np.zeros(0)
+  AT = A.T.tocsr()
+  x = np.full(n, 1.0 / n)
+  for _ in range(max_iter):
+    last = x
+    x = last + AT @ last
+    norm = np.linalg.norm(x)
+    if norm == 0:
+      raise ValueError('Eigenvector centrality is undefined on graphs without edges.')
+    x = x / norm
+    if _converged(x, last, n, tol):
+      return x
+  raise RuntimeError(f'Eigenvector centrality did not converge in {max_iter} iterations.')
+
+def katz_centrality(A, alpha=0.1, beta=1.0, tol=1e-6, max_iter=1000, normalized=True):
+  '''
+    Katz centrality x = alpha A^T x + beta by fixed-point iteration, alpha
+    must be smaller than the inverse of the largest eigenvalue of A
+  '''
+  n = A.shape[0]
+  if n == 0:
+    return np.zeros(0)
+  AT = A.T.tocsr()
+  b = np.broadcast_to(np.asarray(beta, dtype=float), (n,))
+  x = np.zeros(n)
+  for _ in range(max_iter):
+    last = x
+    x = alpha * (AT @ last) + b
+    if _converged(x, last, n, tol):
+      if normalized:
+        norm = np.linalg.norm(x)
+        if norm > 0:
+          x = x / norm
+      return x
+  raise RuntimeError(f'Katz centrality did not converge in {max_iter} iterations.')
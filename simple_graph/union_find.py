@@ -0,0 +1,56 @@
+class UnionFind:
+  '''
+    disjoint sets with path compression and union by rank
+  '''
+
+  def __init__(self, elements=()):
+    self.parent = {}
+    self.rank = {}
+    self.size = {} # size of the set, valid for roots only
+    self.count = 0 # number of sets
+    for x in elements:
+      self.add(x)
+
+  def __contains__(self, x):
+    return x in self.parent
+
+  def add(self, x):
+    if x not in self.parent:
+      self.parent[x] = x
+      self.rank[x] = 0
+      self.size[x] = 1
+      self.count += 1
+
+  def find(self, x):
+    parent = self.parent
+    root = x
+    while parent[root] != root:
+      root = parent[root]
+    while parent[x] != root:
+      parent[x], x = root, parent[x]
+    return root
+
+  def union(self, x, y):
+    '''
+      merge the sets of x and y, returns False if they were already joined
+    '''
+    x, y = self.find(x), self.find(y)
+    if x == y:
+      return False
+    if self.rank[x] < self.rank[y]:
+      x, y = y, x
+    self.parent[y] = x
+    self.size[x] += self.size[y]
+    if self.rank[x] == self.rank[y]:
+      self.rank[x] += 1
+    self.count -= 1
+    return True
+
+  def groups(self):
+    '''
+      the sets as lists, ordered by their first element
+    '''
+    groups = {}
+    for x in self.parent:
+      groups.setdefault(self.find(x), []).append(x)
+    return list(groups.values())
@@ -1,41 +1,89 @@
-class Vertex:
-  
-  def __init__(self, **kwargs):
-    for key, value in kwargs.items():
-      if key == 'weight':
-        self.__dict__[key] = float(value)
-      else:
-        self.__dict__[key] = value
-    
-  def __repr__(self):
-    return str(self.to_dict())
-  
-  def to_dict(self):
-    return self.__dict__
-  
-class Vertices:
-  
+from .attributes import AttributeStore, Element
+from .sharing import CopyOnWrite, read_only_class
+class Vertex(Element):
+  '''
+    view of the attributes of one vertex, e.g. vertex.weight
+  '''
+  __slots__ = ()
+
+class Vertices(CopyOnWrite):
+  _transient = ('on_write',)
+
   def __init__(self, verbose=False):
     self.verbose = verbose
+    self.on_write = None # weak reference to the graph's hook for writes through Vertex proxies
     self.clear()
-  
+
   def clear(self):
-    self._vertices = {}
-  
+    self._vertices = {} # vertex -> slot in the attribute store
+    self._store = AttributeStore()
+    self._forget()
+
+  def share(self):
+    '''
+      an O(1) read-only copy sharing the storage, see CopyOnWrite
+    '''
+    V = FrozenVertices.__new__(FrozenVertices)
+    V.__dict__.update(self.__dict__)
+    V._store = self._store.share()
+    V._forget()
+    self._track(V)
+    return V
+
+  def _detach(self):
+    self._vertices = dict(self._vertices)
+
+  def __len__(self):
+    return len(self._vertices)
+
+  def __contains__(self, v):
+    return v in self._vertices
+
   def __getitem__(self, v):
     if v not in self._vertices:
-      if self.verbose:
-        print(f'Vertex {v} is not found.')
       return None
-    return self._vertices[v]
-  
+    return Vertex(self._store, self._vertices[v], self)
+
+  def weight(self, v, default, absent):
+    slot = self._vertices.get(v)
+    return absent if slot is None else self._store.weight(slot, default)
+
   def add(self, v, **kwargs):
+    if self._pending:
+      self._write()
     if v in self._vertices:
-      if self.verbose:
-        print('Vertex', v, 'already exists.')
+      if self.verbose: # keep the existing attributes
         return
-    self._vertices[v] = Vertex(**kwargs)
-  
+      slot = self._vertices[v]
+      self._store.reset(slot)
+      self._store.update(slot, kwargs)
+      return
+    self._vertices[v] = self._store.allocate(kwargs)
+
+  def add_many(self, vertices):
+    '''
+      add attribute-less vertices, skipping those that already exist
+    '''
+    if self._pending:
+      self._write()
+    index = self._vertices
+    new = [v for v in dict.fromkeys(vertices) if v not in index]
+    # the new vertices take consecutive fresh slots, the store grows once
+    start = len(self._store.weights)
+    self._store.extend(len(new))
+    index.update(zip(new, range(start, start + len(new))))
+
   def remove(self, v):
-    return self._vertices.pop(v, None)
-  
\ No newline at end of file
+    '''
+      returns the attributes of the removed vertex, None if it did not exist
+    '''
+    if self._pending:
+      self._write()
+    slot = self._vertices.pop(v, None)
+    if slot is None:
+      return None
+    attributes = self._store.to_dict(slot)
+    self._store.release(slot)
+    return attributes
+
+FrozenVertices = read_only_class(Vertices, 'FrozenVertices')
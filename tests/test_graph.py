@@ -1,5 +1,20 @@
+import os
+import pickle
+import bz2
+import gzip
+import tempfile
+import threading
 import unittest
+from array import array
+from math import inf
 from simple_graph import Graph
+from simple_graph.instrument import Recorder
+from simple_graph.binary import open_binary
+
+try:
+  import scipy
+except ImportError:
+  scipy = None
 
 class TestGraph(unittest.TestCase):
 
@@ -14,6 +29,74 @@ class TestGraph(unittest.TestCase):
     G = Graph({'V': [1]})
     self.assertEqual(G.vertices, [1])
 
+  def test_load(self):
+    txt = '# V weight\na,2\nb,3\n\n# E weight\na,b,4\nb,c,1\n'
+    expected = Graph(txt).to_dict()
+    with tempfile.TemporaryDirectory() as folder:
+      for name, opener in (('g.txt', open), ('g.txt.gz', gzip.open), ('g.txt.bz2', bz2.open)):
+        path = os.path.join(folder, name)
+        with opener(path, 'wt') as f:
+          f.write(txt)
+        G = Graph()
+        lines = []
+        G.load(path, progress=lines.append, progress_every=2)
+        self.assertEqual(G.to_dict(), expected)
+        self.assertEqual(lines, [2, 4, 6, 7])
+    self.assertEqual(G.edge_weight('a', 'b'), 4)
+    self.assertEqual(G.vertex_weight('b'), 3)
+
+  def test_binary(self):
+    G = Graph(undirected=False)
+    G.add_vertex('a', weight=2, color='red')
+    G.add_edge('a', 'b', weight=3, label='x')
+    G.add_edge('b', 'c')
+    G.add_edge('c', 'c', count=4)
+    with tempfile.TemporaryDirectory() as folder:
+      path = os.path.join(folder, 'g.bin')
+      G.save_binary(path)
+      for mmap in (True, False):
+        csr = open_binary(path, mmap=mmap)
+        self.assertEqual(csr.to_dict(), G.to_dict())
+        self.assertEqual(csr.neighbors('a'), ['b'])
+        self.assertEqual(csr.reverse_neighbors('c'), ['b', 'c'])
+        self.assertEqual(csr.to_graph().to_dict(), G.to_dict())
+        del csr
+        # a graph frozen on the file, its stores are built on first use
+        H = Graph.open_binary(path, mmap=mmap)
+        self.assertTrue(H.frozen)
+        self.assertEqual(H.vertex_betweenness(), G.vertex_betweenness())
+        self.assertEqual(H.distances('a'), G.distances('a'))
+        self.assertEqual((H.number_of_vertices(), H.number_of_edges()), (3, 3))
+        self.assertNotIn('E', H.__dict__)
+        self.assertEqual(H.neighbors('a'), ['b'])
+        self.assertEqual(H.to_dict(), G.to_dict())
+        self.assertEqual(H.total_edge_weight(), G.total_edge_weight())
+        self.assertTrue(H.has_self_link)
+        H.add_edge('c', 'a', weight=2)
+        self.assertFalse(H.frozen)
+        self.assertEqual(H.shortest_path('c', 'b'), ['c', 'a', 'b'])
+        del H
+      # tuple labels and values JSON would turn into lists round-trip too
+      G = Graph()
+      G.add_edge((1, 2), (3, 4), weight=2, tag=(5, 6))
+      G.add_vertex((1, 2), meta={1: 'a'})
+      G.save_binary(path)
+      H = Graph.open_binary(path)
+      self.assertEqual(H.to_dict(), G.to_dict())
+      self.assertEqual(H.neighbors((3, 4)), [(1, 2)])
+      del H
+      # ints beyond int64 fall back to JSON
+      H = Graph()
+      H.add_vertex(1, big=-2**63 - 1, small=5)
+      H.add_edge(1, 2, big=2**63, small=-2**63)
+      H.save_binary(path)
+      self.assertEqual(Graph.open_binary(path).to_dict(), H.to_dict())
+      G.add_vertex((5, 6), tags={'a'})
+      self.assertRaises(ValueError, G.save_binary, path)
+      with open(path, 'wb') as f:
+        f.write(b'not a graph file at all')
+      self.assertRaises(ValueError, Graph.open_binary, path)
+
   def test_edge_weight(self):
     G = Graph({0: [1, 2], 1: [2]})
     self.assertEqual(G.total_edge_weight(1), 2)
@@ -29,6 +112,31 @@ class TestGraph(unittest.TestCase):
     self.assertEqual(G.total_edge_weight(1, 'out'), 1)
     self.assertEqual(G.total_edge_weight(1, 'all'), 1)
 
+  def test_incremental_weight_totals(self):
+    G = Graph(undirected=False)
+    G.add_edge(1, 2, weight=3)
+    G.add_edge(2, 3)
+    G.add_edge(3, 3, weight=2)
+    self.assertEqual(G.total_edge_weight(3, 'in'), 3)
+    self.assertEqual(G.total_edge_weight(3, 'all'), 5)
+    self.assertEqual(G.total_edge_weight(), 6)
+    G.add_edge_weight(2, 3, 4)
+    G.edge(1, 2).weight = 1
+    self.assertEqual(G.total_edge_weight(2, 'all'), 6)
+    G.remove_vertex(3)
+    self.assertEqual(G.total_edge_weight(2, 'out'), 0)
+    self.assertEqual(G.total_edge_weight(None, 'all'), 2)
+    G = Graph({'E': [(1, 2, {'weight': 2}), (2, 2, {'weight': 5}), (2, 3)]})
+    self.assertEqual(G.total_edge_weight(2), 8)
+    self.assertEqual(G.total_edge_weight(2, 'all'), 16)
+    self.assertEqual(G.total_edge_weight(), 11)
+    del G.edge(2, 2).weight
+    G.remove_edge(1, 2)
+    self.assertEqual(G.total_edge_weight(), 3)
+    G.add_vertex(4, weight=3)
+    G.add_vertex_weight(1, 1)
+    self.assertEqual(G.total_vertex_weight(), 7)
+
   def test_add_weight(self):
     G = Graph({0: [1, 2], 1: [2]})
     self.assertEqual(G.edge_weight(1, 2), 1)
@@ -38,6 +146,57 @@ class TestGraph(unittest.TestCase):
     G.add_vertex_weight(1, 1)
     self.assertEqual(G.vertex_weight(1), 2)
 
+  def test_attribute_columns(self):
+    G = Graph()
+    G.add_edge(1, 2, weight=3, color='red')
+    G.add_edge(2, 3)
+    e = G.edge(2, 1)
+    self.assertEqual(e.weight, 3.0)
+    self.assertEqual(e.color, 'red')
+    self.assertFalse(hasattr(G.edge(2, 3), 'weight'))
+    e.weight += 1
+    del e.color
+    self.assertEqual(G.edge(1, 2).to_dict(), {'weight': 4.0})
+    self.assertEqual(e, G.edge(1, 2))
+    slot = G.E.slot(1, 2)
+    G.remove_edge(1, 2)
+    G.add_edge(3, 4)
+    self.assertEqual(G.E.slot(3, 4), slot)
+    self.assertEqual(G.edge(3, 4).to_dict(), {})
+    self.assertFalse(G.E.has_weights)
+    G.add_vertex(5, weight=2, name='five')
+    self.assertEqual(G.vertex(5).name, 'five')
+    self.assertEqual(G.vertex_weight(5), 2.0)
+    self.assertEqual(G.V.remove(5), {'weight': 2.0, 'name': 'five'})
+
+  def test_proxy_writes(self):
+    G = Graph({'E': [(1, 2), (2, 3), (1, 3, {'weight': 5})]})
+    G.freeze()
+    self.assertEqual(G.distances(1), {1: 0, 2: 1, 3: 2})
+    version = G.version
+    G.edge(1, 3).weight = 0.5
+    self.assertGreater(G.version, version)
+    self.assertFalse(G.frozen)
+    self.assertEqual(G.distances(1), {1: 0, 2: 1.0, 3: 0.5})
+    G.freeze()
+    G.edge(1, 3).weight = 10
+    self.assertEqual(G.edge_betweenness(normalized=False)[(1, 3)], 0)
+    G.enable_cache()
+    self.assertEqual(G.shortest_path(1, 3), [1, 2, 3])
+    del G.edge(1, 3).weight
+    self.assertEqual(G.shortest_path(1, 3), [1, 3])
+    version = G.version
+    G.vertex(2).color = 'red'
+    self.assertGreater(G.version, version)
+    G.enable_concurrency()
+    with G._lock.read():
+      with self.assertRaises(RuntimeError):
+        G.edge(1, 2).weight = 2
+    H = pickle.loads(pickle.dumps(G))
+    H.edge(1, 2).weight = 4
+    self.assertEqual(H.shortest_path_length(1, 3), 1)
+    self.assertEqual(G.edge_weight(1, 2), 1)
+
   def test_to_dict(self):
     G = Graph({1: {1: {'weight': 6}, 2: {'weight': 2}, 0: {'weight': 2}}, 2: {1: {'weight': 2}, 2: {'weight': 6}, 0: {'weight': 2}}, 0: {1: {'weight': 2}, 2: {'weight': 2}, 0: {'weight': 6}}})
     self.assertEqual(G.to_dict(), 
@@ -65,6 +224,33 @@ class TestGraph(unittest.TestCase):
     G.add_vertex(3)
     self.assertEqual(G.find_isolated_vertices(), [3])
 
+  def test_add_edges_from_arrays(self):
+    edges = [(1, 2, {'weight': 2, 'a': 1}), (2, 1, {'b': 3}), (3, 3), (2, 4, {'weight': 1})]
+    G = Graph()
+    for edge in edges:
+      G.add_edge(edge[0], edge[1], **(edge[2] if len(edge) > 2 else {}))
+    H = Graph()
+    H.add_edges(edges)
+    self.assertEqual(H.to_dict(), G.to_dict())
+    self.assertEqual(H.to_dict()['E'][0], (1, 2, {'b': 3}))
+    self.assertEqual(H.number_of_self_loops(), 1)
+    H = Graph(undirected=False)
+    H.add_vertex(1)
+    H.add_vertex(2)
+    H.add_edges_from_arrays(array('q', [1, 2, 2, 3]), array('q', [2, 1, 1, 1]), weights=[1, 2, 5, 3], allow_add_vertex=False)
+    self.assertEqual(H.edges, [(1, 2), (2, 1)])
+    self.assertEqual(H.edge_weight(2, 1), 5)
+    self.assertFalse(H.has_vertex(3))
+    self.assertRaises(ValueError, H.add_edges_from_arrays, [1], [2, 3])
+    # weights only: filled in bulk, a repeated pair keeps its last weight
+    H = Graph()
+    H.add_edge(1, 2, weight=9, color='red')
+    H.add_edges_from_arrays([1, 2, 3, 3], [2, 3, 2, 3], weights=[4, 1, 2, 5])
+    self.assertEqual(H.to_dict()['E'], [(1, 2, {'weight': 4.0}), (2, 3, {'weight': 2.0}), (3, 3, {'weight': 5.0})])
+    self.assertEqual(H.total_edge_weight(3), 7)
+    self.assertEqual(H.total_edge_weight(), 17)
+    self.assertEqual(sorted(H.V._vertices.values()), [0, 1, 2])
+
   def test_remove_vertex(self):
     G = Graph(undirected=False)
     G.add_edge(1, 2)
@@ -102,6 +288,21 @@ class TestGraph(unittest.TestCase):
     G = Graph({0: [1, 2], 1: [2]})
     self.assertEqual(set(G.neighbors(1)), {0, 2})
         
+  def test_neighbor_views(self):
+    G = Graph({0: [1, 2], 1: [2]})
+    view = G.neighbors(1)
+    self.assertEqual(len(view), 2)
+    self.assertIn(0, view)
+    self.assertNotIn(3, view)
+    self.assertEqual(view, [2, 0])
+    self.assertEqual(len(G.neighbors(5)), 0)
+    self.assertEqual(list(G.iter_vertices()), [0, 1, 2])
+    self.assertEqual(list(G.iter_edges()), G.edges)
+    G = Graph({0: {1: {'weight': 2}}}, undirected=False)
+    self.assertEqual(list(G.iter_edges(data=True)), [(0, 1, {'weight': 2.0})])
+    self.assertEqual(G.reverse_neighbors(1), [0])
+    self.assertEqual(G.neighbors(1), [])
+
   def test_add_edge(self):
     G = Graph()
     self.assertEqual(G.has_edge(1, 2), False)
@@ -144,6 +345,63 @@ class TestGraph(unittest.TestCase):
     self.assertEqual(G.find_path('a', 'f'), None)
     self.assertEqual(G.find_path('c', 'c'), ['c'])
         
+  def test_shortest_path(self):
+    G = Graph({
+      "a" : ["d"],
+      "b" : ["c"],
+      "c" : ["b", "c", "d", "e"],
+      "d" : ["a", "c"],
+      "e" : ["c"],
+      "f" : []
+    })
+    self.assertEqual(G.shortest_path('a', 'e'), ['a', 'd', 'c', 'e'])
+    self.assertEqual(G.shortest_path_length('a', 'e'), 3)
+    self.assertEqual(G.shortest_path('a', 'f'), None)
+    self.assertEqual(G.shortest_path_length('a', 'f'), inf)
+    self.assertEqual(G.shortest_path('c', 'c'), ['c'])
+    G = Graph({'s': {'u':{'weight': 10}, 'x':{'weight': 5}},
+    'u': {'v':{'weight': 1}, 'x':{'weight': 2}},
+    'v': {'y':{'weight': 4}},
+    'x':{'u':{'weight': 3},'v':{'weight': 9},'y':{'weight': 2}},
+    'y':{'s':{'weight': 7},'v':{'weight': 6}}}, undirected=False)
+    self.assertEqual(G.shortest_path('s', 'v'), ['s', 'x', 'u', 'v'])
+    self.assertEqual(G.shortest_path_length('s', 'v'), 9)
+    self.assertEqual(G.shortest_path('s', 'v', weight=None), ['s', 'u', 'v'])
+    self.assertEqual(G.shortest_path('v', 's', heuristic=lambda v, t: 0), ['v', 'y', 's'])
+    self.assertEqual(G.shortest_path_length('v', 's', heuristic=lambda v, t: 0), 11)
+
+  def test_distances(self):
+    G = Graph({'s': {'u':{'weight': 10}, 'x':{'weight': 5}},
+    'u': {'v':{'weight': 1}, 'x':{'weight': 2}},
+    'v': {'y':{'weight': 4}},
+    'x':{'u':{'weight': 3},'v':{'weight': 9},'y':{'weight': 2}},
+    'y':{'s':{'weight': 7},'v':{'weight': 6}}}, undirected=False)
+    expected = {'s': 0, 'x': 5, 'u': 8, 'y': 7, 'v': 9}
+    for queue in ['auto', 'heap', 'radix']:
+      self.assertEqual(G.distances('s', queue=queue), expected)
+    dist, pred = G.distances('s', predecessors=True)
+    self.assertEqual(pred, {'s': None, 'x': 's', 'u': 'x', 'y': 'x', 'v': 'u'})
+    self.assertEqual(G.distances('s', cutoff=7), {'s': 0, 'x': 5, 'y': 7})
+    self.assertEqual(G.distances('s', weight=None), {'s': 0, 'u': 1, 'x': 1, 'v': 2, 'y': 2})
+    self.assertEqual(G.multi_source_distances(['u', 'y']), {'u': 0, 'y': 0, 'v': 1, 'x': 2, 's': 7})
+    self.assertEqual(dict(G.distances_from(['v', 'y'], cutoff=6)), {'v': {'v': 0, 'y': 4}, 'y': {'y': 0, 'v': 6}})
+    # an unknown source is reported by name, not as a bare KeyError
+    for query in (lambda: G.distances('z'), lambda: G.multi_source_distances(['u', 'z']), lambda: dict(G.distances_from(['v', 'z']))):
+      with self.assertRaisesRegex(ValueError, "'z'"):
+        query()
+    # the integer weights of the radix heap are converted once per snapshot
+    engine = G._shortest_paths('weight')
+    self.assertIs(engine._edge_weights(True), engine._edge_weights(True))
+    self.assertEqual(G.distances('s', weight=None, queue='radix'), G.distances('s', weight=None))
+    with self.assertRaises(ValueError):
+      G.distances('s', queue='bfs')
+    G.add_edge('s', 'u', weight=0.5)
+    with self.assertRaises(ValueError):
+      G.distances('s', queue='radix')
+    G.add_edge('s', 'u', weight=-1)
+    with self.assertRaises(ValueError):
+      G.distances('s')
+
   def test_find_all_paths(self):
     G = Graph({ 
       "a" : ["d", "f"],
@@ -156,6 +414,29 @@ class TestGraph(unittest.TestCase):
     self.assertEqual(G.find_all_paths('a', 'b'), [['a', 'd', 'c', 'b'], ['a', 'f', 'd', 'c', 'b']])
     self.assertEqual(G.find_all_paths('a', 'f'), [['a', 'd', 'f'], ['a', 'f']])
     self.assertEqual(G.find_all_paths('c', 'c'), [['c']])
+    paths = G.iter_paths('a', 'b')
+    self.assertEqual(next(paths), ['a', 'd', 'c', 'b'])
+    self.assertEqual(list(G.iter_paths('a', 'b', max_length=3)), [['a', 'd', 'c', 'b']])
+    self.assertEqual(list(G.iter_paths('a', 'c', limit=1)), [['a', 'd', 'c']])
+    G = Graph({'s': {'u':{'weight': 10}, 'x':{'weight': 5}},
+    'u': {'v':{'weight': 1}, 'x':{'weight': 2}},
+    'v': {'y':{'weight': 4}},
+    'x':{'u':{'weight': 3},'v':{'weight': 9},'y':{'weight': 2}},
+    'y':{'s':{'weight': 7},'v':{'weight': 6}}}, undirected=False)
+    self.assertEqual(list(G.iter_paths('s', 'v', shortest=True, limit=3)), [['s', 'x', 'u', 'v'], ['s', 'u', 'v'], ['s', 'x', 'y', 'v']])
+    self.assertEqual(list(G.iter_paths('s', 'v', shortest=True, weight=None, max_length=2)), [['s', 'u', 'v'], ['s', 'x', 'v']])
+    self.assertEqual(list(G.iter_paths('s', 'v', shortest=True, max_length=2)), [['s', 'u', 'v'], ['s', 'x', 'v']])
+    # no path is short enough: the search stops without enumerating the
+    # millions of simple paths across the grid
+    G = Graph()
+    for i in range(7):
+      for j in range(7):
+        if i < 6:
+          G.add_edge((i, j), (i + 1, j), weight=1 + i * j % 3)
+        if j < 6:
+          G.add_edge((i, j), (i, j + 1), weight=1 + (i + j) % 2)
+    self.assertEqual(list(G.iter_paths((0, 0), (6, 6), shortest=True, max_length=11)), [])
+    self.assertEqual(len(list(G.iter_paths((0, 0), (6, 6), shortest=True, max_length=12, limit=5))), 5)
         
   def test_degree(self):
     G = Graph(
@@ -175,11 +456,45 @@ class TestGraph(unittest.TestCase):
 {'V': ['a', 'd', 'b', 'c', 'e', 'f'], 'E': [('a', 'd'), ('b', 'c'), ('c', 'c'), ('c', 'e'), ('d', 'c')]})
     self.assertEqual(G.min_degree(), 0)
       
+  def test_core_numbers(self):
+    G = Graph({'E': [(1, 2), (1, 3), (2, 3), (3, 4), (4, 5), (5, 5)]})
+    G.add_vertex(6)
+    self.assertEqual(G.core_numbers(), {1: 2, 2: 2, 3: 2, 4: 1, 5: 1, 6: 0})
+    order = G.degeneracy_ordering()
+    self.assertEqual(order[0], 6)
+    self.assertEqual(set(order[-3:]), {1, 2, 3})
+    core = G.k_core()
+    self.assertEqual(set(core.vertices), {1, 2, 3})
+    self.assertEqual(len(core.edges), 3)
+    self.assertEqual(set(G.k_core(1).vertices), {1, 2, 3, 4, 5})
+    G = Graph({'E': [(1, 2), (2, 3), (3, 1), (1, 4)]}, undirected=False)
+    self.assertEqual(G.core_numbers('out'), {1: 1, 2: 1, 3: 1, 4: 0})
+    self.assertEqual(G.core_numbers('in'), {1: 1, 2: 1, 3: 1, 4: 1})
+    self.assertEqual(G.core_numbers(), {1: 2, 2: 2, 3: 2, 4: 1})
+    self.assertRaises(ValueError, G.core_numbers, 'both')
+
   def test_degrees(self):
     G = Graph(
 {'V': ['a', 'd', 'b', 'c', 'e', 'f'], 'E': [('a', 'd'), ('b', 'c'), ('c', 'c'), ('c', 'e'), ('d', 'c')]})
     self.assertEqual(G.degrees(), [5, 2, 1, 1, 1, 0])
         
+  def test_counters(self):
+    G = Graph({'V': ['a', 'd', 'b', 'c', 'e', 'f'], 'E': [('a', 'd'), ('b', 'c'), ('c', 'c'), ('c', 'e'), ('d', 'c')]})
+    self.assertEqual(G.number_of_vertices(), 6)
+    self.assertEqual(G.number_of_edges(), 5)
+    self.assertEqual(G.number_of_self_loops(), 1)
+    self.assertEqual(G.degree_histogram(), [1, 3, 1, 0, 0, 1])
+    G.remove_vertex('c')
+    self.assertEqual(G.number_of_edges(), 1)
+    self.assertEqual(G.number_of_self_loops(), 0)
+    self.assertEqual(G.degree_histogram(), [3, 2])
+    G = Graph({1: [2, 3], 2: [3], 3: [3]}, undirected=False)
+    self.assertEqual(G.in_degree(3), 3)
+    self.assertEqual(G.out_degree(3), 1)
+    self.assertEqual(G.degree(3), 2)
+    G.remove_edge(3, 3)
+    self.assertEqual((G.in_degree(3), G.out_degree(3), G.number_of_edges()), (2, 0, 3))
+
   def test_density(self):
     G = Graph({ 
       "a" : ["d","f"],
@@ -236,6 +551,29 @@ class TestGraph(unittest.TestCase):
     self.assertEqual(G.is_connected(), True)
         
         
+  def test_connectivity_index(self):
+    G = Graph({'E': [(i, i + 1) for i in range(5000)]})
+    self.assertTrue(G.is_connected())
+    G = Graph({'E': [(1, 2), (2, 3), (4, 5)]})
+    G.enable_connectivity_index()
+    self.assertTrue(G.same_component(1, 3))
+    self.assertFalse(G.same_component(1, 4))
+    self.assertEqual(G.number_of_components(), 2)
+    G.add_vertex(6)
+    self.assertEqual(G.component_sizes(), [3, 2, 1])
+    G.add_edge(3, 4)
+    self.assertTrue(G.same_component(1, 5))
+    self.assertEqual(G.connected_components, [[1, 2, 3, 4, 5], [6]])
+    G.remove_edge(2, 3)
+    self.assertFalse(G.same_component(1, 5))
+    self.assertEqual(G.number_of_components(), 3)
+    G.remove_vertex(4)
+    self.assertEqual(G.component_sizes(), [2, 1, 1, 1])
+    self.assertFalse(G.is_connected())
+    G.add_edges_from_arrays([2, 5, 6], [3, 3, 1])
+    self.assertTrue(G.is_connected())
+    self.assertEqual(G.component_of(6), G.component_of(5))
+
   def test_diameter(self):
     G = Graph({ 
       "a" : ["c"],
@@ -246,6 +584,32 @@ class TestGraph(unittest.TestCase):
       "f" : ["b","e"]
     })
     self.assertEqual(G.diameter(), 3)
+    self.assertEqual(G.diameter(method='bfs'), 3)
+    G.add_vertex('g')
+    self.assertEqual(G.diameter(), inf)
+
+  def test_eccentricity(self):
+    G = Graph({'E': [(1, 2), (2, 3), (3, 4), (4, 5), (2, 6)]})
+    self.assertEqual(G.eccentricity(), {1: 4, 2: 3, 3: 2, 4: 3, 5: 4, 6: 4})
+    self.assertEqual(G.eccentricity(5), 4)
+    self.assertEqual(G.radius(), 2)
+    self.assertEqual(G.center(), [3])
+    self.assertEqual(G.periphery(), [1, 5, 6])
+    self.assertEqual(G.periphery(method='bfs'), [1, 5, 6])
+    G = Graph({'E': [(1, 2, {'weight': 5}), (2, 3), (1, 3)]})
+    self.assertEqual(G.diameter(), 2)
+    self.assertEqual(G.diameter(weighted=False), 1)
+    # bound pruning needs a handful of searches, not one per vertex
+    G = Graph()
+    G.generate_barabasi_albert(1000, 3, seed=1)
+    ecc = G.eccentricity(method='bfs')
+    d = max(ecc.values())
+    instrumentation = G.enable_instrumentation()
+    self.assertEqual(G.diameter(), d)
+    self.assertLessEqual(instrumentation.counters['eccentricity_searches'], 8)
+    instrumentation.reset()
+    self.assertEqual(G.periphery(), [v for v in ecc if ecc[v] == d])
+    self.assertLessEqual(instrumentation.counters['eccentricity_searches'], 12)
     
   def test_edge_betweenness(self):
     G = Graph({'s': {'u':{'weight': 10}, 'x':{'weight': 5}},
@@ -264,6 +628,53 @@ class TestGraph(unittest.TestCase):
  ('y', 's'): 0.4,
  ('y', 'v'): 0.05})
     
+  def test_unweighted_betweenness(self):
+    G = Graph({'E': [(1, 2), (2, 3), (3, 4), (4, 1), (2, 5)]})
+    self.assertFalse(G.E.has_weights)
+    expected = G.edge_betweenness()
+    G.add_edge_weight(1, 2, 0)
+    self.assertTrue(G.E.has_weights)
+    weighted = G.edge_betweenness()
+    for e in expected:
+      self.assertAlmostEqual(weighted[e], expected[e])
+    G.remove_edge(1, 2)
+    self.assertFalse(G.E.has_weights)
+    G.add_edge(3, 5, weight=2)
+    G.remove_vertex(5)
+    self.assertFalse(G.E.has_weights)
+
+  def test_edge_betweenness_parallel_sampled(self):
+    G = Graph({'E': [(1, 2), (2, 3), (3, 4), (4, 1), (2, 5), (5, 6), (6, 3)]})
+    expected = G.edge_betweenness()
+    parallel = G.edge_betweenness(workers=2)
+    self.assertEqual(list(parallel), list(expected))
+    for e in expected:
+      self.assertAlmostEqual(parallel[e], expected[e])
+    self.assertEqual(G.edge_betweenness(k=6), expected)
+    estimate, error = G.edge_betweenness(k=3, seed=1, return_error=True)
+    self.assertEqual(estimate, G.edge_betweenness(k=3, seed=1))
+    self.assertEqual(set(error), set(expected))
+    self.assertTrue(all(x >= 0 for x in error.values()))
+
+  def test_vertex_betweenness(self):
+    G = Graph({'E': [(1, 2), (2, 3), (3, 4), (2, 5)]})
+    self.assertEqual(G.vertex_betweenness(normalized=False), {1: 0.0, 2: 5.0, 3: 3.0, 4: 0.0, 5: 0.0})
+    vertex, edge = G.betweenness(kind='both')
+    self.assertEqual(vertex, G.vertex_betweenness())
+    self.assertEqual(edge, G.edge_betweenness())
+    self.assertEqual(G.betweenness(kind='edge'), edge)
+    self.assertRaises(ValueError, G.betweenness, kind='path')
+
+  def test_closeness_harmonic(self):
+    G = Graph({'E': [(1, 2), (2, 3), (3, 4)]})
+    G.add_vertex(5)
+    self.assertEqual(G.closeness_centrality(), {1: 0.375, 2: 0.5625, 3: 0.5625, 4: 0.375, 5: 0.0})
+    self.assertEqual(G.harmonic_centrality()[1], 1 + 1 / 2 + 1 / 3)
+    result = G.centrality()
+    self.assertEqual(set(result), {'vertex_betweenness', 'edge_betweenness', 'closeness', 'harmonic'})
+    self.assertEqual(result['closeness'], G.closeness_centrality())
+    self.assertRaises(ValueError, G.centrality, ('closeness',), k=2)
+
   def test_connected_components(self):
     G = Graph({'E':[(1, 2), (2, 3), (4, 5)] })
     self.assertEqual(G.connected_components, [[1, 2, 3], [4, 5]])
@@ -271,6 +682,245 @@ class TestGraph(unittest.TestCase):
   def test_max_cliques(self):
     G = Graph({'E': [(1, 2), (1, 3), (1, 4), (1, 5), (2, 3), (2, 4), (3, 4), (4, 5)]})
     self.assertEqual(G.max_cliques, [[1, 4, 2, 3], [1, 4, 5]])
+    cliques = G.iter_cliques()
+    self.assertEqual(set(map(frozenset, cliques)), {frozenset([1, 2, 3, 4]), frozenset([1, 4, 5])})
+    for workers in (None, 2):
+      self.assertEqual([sorted(c) for c in G.iter_cliques(min_size=4, workers=workers)], [[1, 2, 3, 4]])
+
+  def test_freeze(self):
+    G = Graph({'E': [(1, 2), (2, 3), (4, 5), (3, 3)]})
+    G.add_vertex(6)
+    csr = G.freeze()
+    self.assertIs(G.freeze(), csr)
+    self.assertEqual(list(csr.offsets), [0, 1, 3, 5, 6, 7, 7])
+    self.assertEqual(set(csr.neighbors(2)), {1, 3})
+    self.assertEqual(G.connected_components, [[1, 2, 3], [4, 5], [6]])
+    self.assertEqual(G.find_isolated_vertices(), [6])
+    G.add_edge(5, 6)
+    self.assertFalse(G.frozen)
+    self.assertEqual(G.connected_components, [[1, 2, 3], [4, 5, 6]])
+
+  def test_generators(self):
+    G = Graph()
+    G.generate_random_graph(4, 1, seed=1)
+    self.assertEqual(G.vertices, ['1', '2', '3', '4'])
+    self.assertEqual(G.number_of_edges(), 6)
+    G = Graph(undirected=False)
+    G.generate_gnp(30, 0.2, seed=1)
+    H = Graph(undirected=False)
+    H.generate_gnp(30, 0.2, seed=1)
+    self.assertEqual(G.edges, H.edges)
+    self.assertEqual(G.number_of_self_loops(), 0)
+    G.generate_gnm(10, 90, seed=2)
+    self.assertEqual(G.number_of_edges(), 90)
+    G = Graph()
+    G.generate_random_regular(20, 3, seed=3)
+    self.assertEqual(set(G.degrees()), {3})
+    G.generate_barabasi_albert(20, 2, seed=4)
+    self.assertEqual((G.number_of_vertices(), G.number_of_edges()), (20, 36))
+    G.generate_rmat(4, edge_factor=2, seed=5)
+    self.assertEqual(G.number_of_vertices(), 16)
+    self.assertEqual(G.number_of_self_loops(), 0)
+    self.assertRaises(ValueError, G.generate_gnm, 3, 4)
+
+  def test_instrumentation(self):
+    G = Graph({'s': {'u':{'weight': 10}, 'x':{'weight': 5}},
+    'u': {'v':{'weight': 1}, 'x':{'weight': 2}},
+    'v': {'y':{'weight': 4}},
+    'x':{'u':{'weight': 3},'v':{'weight': 9},'y':{'weight': 2}},
+    'y':{'s':{'weight': 7},'v':{'weight': 6}}}, undirected=False)
+    recorder = Recorder()
+    instrumentation = G.enable_instrumentation(recorder)
+    G.add_edge('s', 'u', weight=10)
+    G.add_edge('a', 'b', allow_add_vertex=False)
+    self.assertEqual(recorder.events, [('edge_exists', {'edge': ('s', 'u')}), ('vertex_not_found', {'vertex': 'a', 'edge': ('a', 'b')})])
+    G.edge_betweenness()
+    self.assertEqual(instrumentation.counters['dijkstra_settled'], 25)
+    self.assertEqual(instrumentation.counters['relaxations'], 50)
+    name, seconds, fields = recorder.spans[-1]
+    self.assertEqual(name, 'centrality')
+    self.assertEqual(fields['counters']['relaxations'], 50)
+    # the same work is reported when the searches run on the frozen CSR
+    instrumentation.reset()
+    G.freeze()
+    G.edge_betweenness()
+    self.assertEqual((instrumentation.counters['dijkstra_settled'], instrumentation.counters['relaxations']), (25, 50))
+    H = Graph({'E': [(1, 2), (2, 3), (2, 4)]})
+    for frozen in (False, True):
+      if frozen:
+        H.freeze()
+      summary = H.enable_instrumentation()
+      H.vertex_betweenness()
+      self.assertEqual((summary.counters['bfs_visited'], summary.counters['relaxations']), (16, 24))
+      self.assertEqual(summary.summary()['observations']['bfs_frontier']['max'], 3)
+    G.distances('s', weight=None)
+    self.assertEqual(instrumentation.summary()['observations']['bfs_frontier']['max'], 2)
+    G.add_edge('t', 's')
+    self.assertEqual((instrumentation.counters['edges_added'], instrumentation.counters['vertices_added']), (1, 1))
+    G.disable_instrumentation()
+    G.add_edge('t', 'u')
+    self.assertEqual(instrumentation.counters['edges_added'], 1)
+    G = Graph(verbose=True)
+    with self.assertLogs('simple_graph') as logs:
+      G.remove_vertex(1)
+    self.assertIn('vertex_not_found', logs.output[0])
+
+  @unittest.skipIf(scipy is None, 'scipy is not installed')
+  def test_sparse(self):
+    G = Graph({'E': [(0, 1, {'weight': 2}), (1, 2), (2, 0)]}, undirected=False)
+    A = G.to_sparse_adjacency()
+    self.assertEqual(A.toarray().tolist(), [[0, 2, 0], [0, 0, 1], [1, 0, 0]])
+    self.assertEqual(G.to_sparse_adjacency(weight=None).sum(), 3)
+    self.assertEqual(G.laplacian_matrix().toarray().tolist(), [[2, -2, 0], [0, 1, -1], [-1, 0, 1]])
+    self.assertEqual(G.transition_matrix().sum(axis=1).tolist(), [[1], [1], [1]])
+    for value in G.pagerank(tol=1e-10).values():
+      self.assertAlmostEqual(value, 1 / 3)
+    ranks = G.personalized_pagerank([0], tol=1e-10, max_iter=500)
+    self.assertAlmostEqual(sum(ranks.values()), 1)
+    self.assertGreater(ranks[0], ranks[1])
+    self.assertGreater(ranks[1], ranks[2])
+    H = Graph.from_sparse(A, labels=['a', 'b', 'c'], undirected=False)
+    self.assertEqual(H.edges, [('a', 'b'), ('b', 'c'), ('c', 'a')])
+    self.assertEqual(H.edge_weight('a', 'b'), 2)
+    G = Graph({'E': [(1, 2), (2, 3)]})
+    centrality = G.eigenvector_centrality(tol=1e-10, max_iter=1000)
+    self.assertAlmostEqual(centrality[2], 2 ** 0.5 * centrality[1], places=5)
+    katz = G.katz_centrality(normalized=False, tol=1e-12)
+    self.assertAlmostEqual(katz[1], katz[3])
+    self.assertAlmostEqual(katz[2], 1 + 0.1 * (katz[1] + katz[3]))
+
+  def test_cache(self):
+    G = Graph({'E': [(1, 2), (2, 3), (4, 5)]})
+    self.assertIsNone(G.cache_info())
+    version = G.version
+    G.enable_cache(maxsize=2)
+    components = G.connected_components
+    components[0].append(6)
+    components.pop()
+    self.assertEqual(G.connected_components, [[1, 2, 3], [4, 5]])
+    degrees = G.degrees()
+    degrees.clear()
+    self.assertEqual(G.degrees(), [2, 1, 1, 1, 1])
+    self.assertEqual(G.shortest_path(1, 3), [1, 2, 3])
+    info = G.cache_info()
+    self.assertEqual((info['hits'], info['misses'], info['evictions'], info['size']), (2, 3, 1, 2))
+    G.add_edge(3, 4)
+    self.assertGreater(G.version, version)
+    self.assertEqual(G.connected_components, [[1, 2, 3, 4, 5]])
+    self.assertEqual(G.cache_info()['invalidations'], 2)
+    G.add_edge_weight(1, 2, 5)
+    self.assertEqual(G.shortest_path_length(1, 3), 7)
+    G.disable_cache()
+    self.assertIsNone(G.cache_info())
+
+  def test_concurrency(self):
+    G = Graph({'E': [(i, i + 1) for i in range(50)]})
+    self.assertFalse(G.concurrent)
+    with G.transaction():
+      G.add_edge(0, 50)
+    G.enable_concurrency()
+    self.assertTrue(G.concurrent)
+    errors = []
+    stop = threading.Event()
+
+    def read():
+      try:
+        while not stop.is_set():
+          # every transaction keeps the edge count at 51
+          self.assertEqual(len(G.edges), 51)
+          self.assertEqual(G.number_of_components(), 1)
+          self.assertEqual(G.shortest_path_length(0, 25, weight=None), 25)
+      except Exception as e:
+        errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for thread in readers:
+      thread.start()
+    for i in range(1, 49):
+      with G.transaction():
+        G.add_edge(i, i + 2)
+        G.remove_edge(i, i + 2)
+        G.add_vertex(-i)
+        G.remove_vertex(-i)
+    stop.set()
+    for thread in readers:
+      thread.join()
+    self.assertEqual(errors, [])
+    self.assertIsInstance(G.neighbors(1), list)
+    vertices = G.iter_vertices()
+    next(vertices)
+    G.add_edge(0, 2)
+    with self.assertRaises(RuntimeError):
+      next(vertices)
+    with G._lock.read():
+      with self.assertRaises(RuntimeError):
+        G.add_edge(0, 3)
+    G.enable_cache()
+    self.assertEqual(pickle.loads(pickle.dumps(G)).number_of_edges(), 52)
+    G.disable_concurrency()
+    self.assertIsNone(G._lock)
+
+  def test_snapshot(self):
+    G = Graph({'E': [(1, 2, {'weight': 3}), (2, 3), (3, 4, {'color': 'red'})]})
+    S = G.snapshot()
+    expected = S.to_dict()
+    G.add_edge(1, 3, weight=5)
+    G.remove_edge(2, 3)
+    G.remove_vertex(4)
+    G.edge(1, 2).weight = 10
+    G.add_vertex(5, label='new')
+    self.assertEqual(S.to_dict(), expected)
+    self.assertEqual(S.total_edge_weight(), 10)
+    self.assertEqual(G.total_edge_weight(), 30)
+    self.assertEqual(S.shortest_path(1, 4), [1, 2, 3, 4])
+    self.assertEqual(G.edges, [(1, 2), (1, 3)])
+    with self.assertRaises(TypeError):
+      S.add_edge(1, 4)
+    with self.assertRaises(TypeError):
+      S.edge(1, 2).weight = 1
+    self.assertEqual(S.to_dict(), expected)
+    # once the snapshot is gone the graph stops copying on write
+    del S
+    G.add_edge(2, 5)
+    self.assertIsNone(G.E._owned)
+    self.assertEqual(pickle.loads(pickle.dumps(G.snapshot())).edges, G.edges)
+    # a snapshot sharing the frozen CSR has its own shortest-path buffers
+    G = Graph({'E': [(i, j) for i in range(60) for j in (i + 1, i * 7 % 60) if i != j]})
+    G.freeze()
+    S = G.snapshot()
+    expected = {s: G.distances(s) for s in range(60)}
+    errors = []
+
+    def query(H):
+      for _ in range(5):
+        for s in range(60):
+          if H.distances(s) != expected[s]:
+            errors.append(s)
+
+    threads = [threading.Thread(target=query, args=(H,)) for H in (G, S)]
+    for thread in threads:
+      thread.start()
+    for thread in threads:
+      thread.join()
+    self.assertEqual(errors, [])
+    self.assertIsNot(S._shortest_paths('weight'), G._shortest_paths('weight'))
+
+  def test_freeze_analytics(self):
+    G = Graph({'s': {'u':{'weight': 10}, 'x':{'weight': 5}},
+    'u': {'v':{'weight': 1}, 'x':{'weight': 2}},
+    'v': {'y':{'weight': 4}},
+    'x':{'u':{'weight': 3},'v':{'weight': 9},'y':{'weight': 2}},
+    'y':{'s':{'weight': 7},'v':{'weight': 6}}}, undirected=False)
+    expected = G.edge_betweenness()
+    G.freeze()
+    frozen = G.edge_betweenness()
+    self.assertEqual(list(frozen), list(expected))
+    for e in expected:
+      self.assertAlmostEqual(frozen[e], expected[e])
+    G = Graph({'E': [(1, 2), (1, 3), (1, 4), (1, 5), (2, 3), (2, 4), (3, 4), (4, 5)]})
+    expected = G.max_cliques
+    G.freeze()
+    self.assertEqual({frozenset(c) for c in G.max_cliques}, {frozenset(c) for c in expected})
 
 if __name__ == '__main__':
     unittest.main()